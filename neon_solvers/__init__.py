@@ -26,46 +26,666 @@
 # NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from neon_solvers.solver import AbstractSolver
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, \
+    TimeoutError
+from multiprocessing.util import Finalize
+from threading import Event, Lock, RLock, Thread
+from time import monotonic
+from uuid import uuid4
+
+from neon_solvers.breaker import CircuitBreaker
+from neon_solvers.cache import require_shared_backends
+from neon_solvers.solver import AbstractSolver, RecentFailure
 
-from ovos_plugin_manager.solvers import find_question_solver_plugins, load_question_solver_plugin
 from ovos_utils.log import LOG
 
 
+class _Queued(TimeoutError):
+    """ a solver call could not start in time, every thread of the solver
+    is busy, usually with calls abandoned after a timeout """
+
+
+class _SolverCall:
+    """
+    a solver call submitted to the solver's own executor
+
+    start is set once the call actually runs, time spent queued behind
+    other calls to the same solver does not count towards its timeout
+    """
+    __slots__ = ("future", "started", "start")
+
+    def __init__(self, executor, func, *args):
+        self.started = Event()
+        self.start = None
+        self.future = executor.submit(self._run, func, *args)
+
+    def _run(self, func, *args):
+        self.start = monotonic()
+        self.started.set()
+        return func(*args)
+
+
 class NeonSolversService:
+    # bus message type -> solver method used to answer it
+    BUS_REQUESTS = {
+        "neon.solvers.question": "spoken_answer",
+        "neon.solvers.search": "search",
+        "neon.solvers.long_answer": "long_answer"
+    }
+
     def __init__(self, bus, config=None):
         self.config_core = config or {}
         self.loaded_modules = {}
-        self.bus = bus
+        self.breakers = {}
+        # seconds spent importing and instantiating each plugin
+        self.load_times = {}
+        # lang -> names of solvers supporting it natively, by priority
+        self.lang_routes = {}
+        self.bus = None
         self.config = self.config_core.get("solvers") or {}
-        self.load_plugins()
+        self._executor = None
+        # each solver gets its own threads, calls abandoned after a timeout
+        # keep running without starving the other solvers
+        self._solver_executors = {}
+        # name -> submitted solver calls that did not finish yet
+        self._busy = {}
+        self._busy_lock = Lock()
+        self._process_pool = None
+        self._bus_executor = None
+        self._bus_pending = 0
+        self._bus_lock = Lock()
+        self._load_lock = RLock()
+        self._plugins_loaded = False
+        # plugins are loaded in the worker processes instead
+        self.process_workers = self.config.get("process_workers") or 0
+        if not self.config.get("lazy_load", False):
+            self.load_plugins()
+        elif self.config.get("warmup", False) and not self.process_workers:
+            Thread(target=self.load_plugins, daemon=True,
+                   name="neon_solvers_warmup").start()
+        if bus is not None:
+            self.bind(bus)
 
     def load_plugins(self):
-        for plug_name, plug in find_question_solver_plugins().items():
-            if plug_name in self.config:
+        # with process workers the plugins only live in the workers
+        if self._plugins_loaded or self.process_workers:
+            return
+        with self._load_lock:
+            if self._plugins_loaded:
+                return
+            installed = _solver_entry_points()
+            # any configured plugin, plugins with their own config section
+            # are reported if missing, other keys may be service settings
+            names = [name for name, cfg in self.config.items()
+                     if name in installed or isinstance(cfg, dict)]
+            for plug_name in names:
+                start = monotonic()
                 try:
+                    if plug_name not in installed:
+                        raise ImportError(f"{plug_name} is not installed")
+                    plug = installed[plug_name].load()
                     self.loaded_modules[plug_name] = plug()
-                    LOG.info(f"loaded question solver plugin: {plug_name}")
+                    self.breakers[plug_name] = CircuitBreaker(
+                        self._plugin_setting(plug_name, "max_failures", 3),
+                        self._plugin_setting(plug_name, "cooldown", 60))
+                    self.load_times[plug_name] = monotonic() - start
+                    LOG.info(f"loaded question solver plugin: {plug_name} "
+                             f"in {self.load_times[plug_name]:.3f}s")
                 except Exception as e:
                     LOG.exception(f"Failed to load question solver plugin: {plug_name}")
+            self.lang_routes = self._build_routes()
+            self._plugins_loaded = True
+
+    def _build_routes(self):
+        routes = {}
+        modules = sorted(self.loaded_modules.items(),
+                         key=lambda k: k[1].priority, reverse=True)
+        for name, module in modules:
+            for lang in getattr(module, "supported_langs", None) or []:
+                routes.setdefault(lang.split("-")[0], []).append(name)
+        return routes
+
+    def _plugin_setting(self, plug_name, key, default=None):
+        """ per plugin setting, falling back to the solvers config section """
+        plug_config = self.config.get(plug_name) or {}
+        return plug_config.get(key, self.config.get(key, default))
 
     @property
     def modules(self):
+        """ loaded solvers by priority, empty with process workers """
+        self.load_plugins()
         return sorted(self.loaded_modules.values(),
                       key=lambda k: k.priority, reverse=True)
 
+    def _available_modules(self, lang=None):
+        """
+        (name, module, timeout) of all solvers, highest priority first
+
+        if lang is given solvers supporting it natively come first unless
+        "prefer_native_solvers" is disabled, the others need translation
+
+        breakers are not checked here, self._allow is only called right
+        before dispatching so unused half open trials are not wasted
+        """
+        self.load_plugins()
+        modules = sorted(self.loaded_modules.items(),
+                         key=lambda k: k[1].priority, reverse=True)
+        if lang and self.config.get("prefer_native_solvers", True):
+            native = set(self.lang_routes.get(lang.split("-")[0], []))
+            # stable sort, priority order is kept within each group
+            modules.sort(key=lambda k: k[0] not in native)
+        return [(name, module, self._plugin_setting(name, "solver_timeout"))
+                for name, module in modules]
+
+    def _allow(self, name):
+        """ check the breaker of a solver that is about to be called """
+        return self.breakers[name].allow()
+
+    def _route(self, utterance, context=None, translate=False):
+        """
+        returns (modules, context) for a request
+
+        context gets a "query_translations" dict shared by all solvers so
+        the utterance is machine translated once per target language, with
+        translate=True all modules are about to be dispatched at once, the
+        ones whose breaker is open are dropped and translations are done
+        right away instead of by the first solver needing them
+        """
+        context = dict(context or {})
+        lang = context.get("lang")
+        modules = self._available_modules(lang)
+        if translate:
+            modules = [m for m in modules if self._allow(m[0])]
+        shared = context["query_translations"] = \
+            dict(context.get("query_translations") or {})
+        if not translate or not lang:
+            return modules, context
+        lang = lang.split("-")[0]
+        for name, module, _ in modules:
+            if not isinstance(module, AbstractSolver) or \
+                    lang in module.supported_langs:
+                continue
+            key = f"{lang}:{module.default_lang}:{utterance}"
+            if key in shared:
+                continue
+            try:
+                shared[key] = module._translate(utterance,
+                                                module.default_lang, lang)
+            except Exception as e:
+                LOG.error(f"{name} failed to translate {utterance}: {e}")
+        return modules, context
+
+    def _record(self, name, error=None):
+        if error is None:
+            self.breakers[name].record_success()
+            return
+        if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+            LOG.warning(f"{name} did not answer in time")
+        elif isinstance(error, RecentFailure):
+            # already logged when it failed, still counts as a failure
+            LOG.debug(str(error))
+        else:
+            LOG.error(f"{name} failed to answer: {error}")
+        self.breakers[name].record_failure()
+        if self.breakers[name].is_open:
+            LOG.warning(f"{name} failed repeatedly, skipping it for "
+                        f"{self.breakers[name].cooldown} seconds")
+
+    @staticmethod
+    def _wait_time(start, timeout, deadline):
+        """ seconds left before the solver timeout or the request deadline """
+        limits = [t for t in (start + timeout if timeout is not None else None,
+                              deadline) if t is not None]
+        if not limits:
+            return None
+        return max(min(limits) - monotonic(), 0)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            workers = self.config.get("max_workers") or \
+                max(len(self.loaded_modules), 1)
+            self._executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="neon_solvers")
+        return self._executor
+
+    def _solver_workers(self, name):
+        return self._plugin_setting(name, "solver_workers", 8)
+
+    def _solver_executor(self, name):
+        with self._load_lock:
+            if name not in self._solver_executors:
+                self._solver_executors[name] = ThreadPoolExecutor(
+                    max_workers=self._solver_workers(name),
+                    thread_name_prefix=f"neon_solvers_{name}")
+            return self._solver_executors[name]
+
+    def _submit(self, name, func, *args):
+        """ run a solver call in the solver's executor, raises _Queued right
+        away instead of queueing if all its threads are busy """
+        executor = self._solver_executor(name)
+        with self._busy_lock:
+            if self._busy.get(name, 0) >= self._solver_workers(name):
+                raise _Queued(f"{name} has no free thread")
+            self._busy[name] = self._busy.get(name, 0) + 1
+        call = _SolverCall(executor, func, *args)
+        call.future.add_done_callback(lambda _: self._call_done(name))
+        return call
+
+    def _call_done(self, name):
+        with self._busy_lock:
+            self._busy[name] -= 1
+
+    def _result(self, call, solver_timeout, deadline):
+        """
+        wait for a _SolverCall, solver_timeout counts from when the call
+        started running, raises _Queued if it did not start within
+        solver_timeout or before the deadline
+        """
+        if not call.started.wait(self._wait_time(monotonic(), solver_timeout,
+                                                 deadline)):
+            call.future.cancel()
+            raise _Queued(f"waited {solver_timeout} seconds for a thread")
+        return call.future.result(
+            timeout=self._wait_time(call.start, solver_timeout, deadline))
+
+    @property
+    def process_pool(self):
+        if self._process_pool is None:
+            config = dict(self.config_core)
+            config["solvers"] = {k: v for k, v in self.config.items()
+                                 if k not in ("process_workers", "lazy_load",
+                                              "warmup")}
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                initializer=_init_worker, initargs=(config,))
+        return self._process_pool
+
     def shutdown(self):
-        for module in self.modules:
+        if self.bus is not None:
+            for msg_type in self.BUS_REQUESTS:
+                self.bus.remove(msg_type, self.handle_bus_request)
+            self.bus = None
+        if self._bus_executor is not None:
+            self._bus_executor.shutdown(wait=False)
+            self._bus_executor = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+        for module in list(self.loaded_modules.values()):
             try:
                 module.shutdown()
             except:
                 pass
+            # in case the plugin shutdown did not call super()
+            if isinstance(module, AbstractSolver):
+                module._release_shared()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        with self._load_lock:
+            executors, self._solver_executors = self._solver_executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=False)
+
+    def spoken_answers(self, utterance, context=None, parallel=None,
+                       timeout=None):
+        """
+        return the answer of the highest priority solver that can answer
+
+        parallel - query all solvers at once instead of one after the other,
+                   defaults to the "parallel" setting of the solvers config
+        timeout - max seconds to wait for an answer, defaults to the
+                  "timeout" setting of the solvers config
 
-    def spoken_answers(self, utterance, context=None):
-        for module in self.modules:
+        each solver can also be given its own "solver_timeout", solvers that
+        keep failing or timing out are skipped for a while
+        """
+        return self._answer("spoken_answer", utterance, context, parallel,
+                            timeout)
+
+    def search(self, utterance, context=None, parallel=None, timeout=None):
+        """ like self.spoken_answers but returns data from solver.search """
+        return self._answer("search", utterance, context, parallel, timeout)
+
+    def long_answer(self, utterance, context=None, parallel=None,
+                    timeout=None):
+        """ like self.spoken_answers but returns steps from
+        solver.long_answer """
+        return self._answer("long_answer", utterance, context, parallel,
+                            timeout)
+
+    def _answer(self, method, utterance, context=None, parallel=None,
+                timeout=None):
+        if self.process_workers:
+            return self.process_pool.submit(
+                _worker_answer, method, utterance, context, parallel,
+                timeout).result()
+        if parallel is None:
+            parallel = self.config.get("parallel", False)
+        if timeout is None:
+            timeout = self.config.get("timeout")
+        if parallel:
+            return self._parallel_answer(method, utterance, context, timeout)
+        deadline = monotonic() + timeout if timeout is not None else None
+        modules, context = self._route(utterance, context)
+        for name, module, solver_timeout in modules:
+            if not self._allow(name):
+                continue
+            # solvers modify context, each one gets its own copy
+            ctx = dict(context)
             try:
-                ans = module.spoken_answers(utterance, context)
+                if solver_timeout is None and deadline is None:
+                    ans = getattr(module, method)(utterance, ctx)
+                else:
+                    ans = self._result(
+                        self._submit(name, getattr(module, method),
+                                     utterance, ctx),
+                        solver_timeout, deadline)
+            except _Queued:
+                # not held against the solver, a half open trial goes to
+                # the next request
+                self.breakers[name].release()
+                if deadline is not None and monotonic() >= deadline:
+                    break
+                continue
+            except Exception as e:
+                self._record(name, e)
+                if deadline is not None and monotonic() >= deadline:
+                    break
+                continue
+            self._record(name)
+            if ans:
+                return ans
+
+    def spoken_answers_batch(self, utterances, context=None):
+        """
+        self.spoken_answers for many utterances at once, each solver only
+        receives the unique utterances not answered by a higher priority one
+        returns answers in input order
+        """
+        answers = {}
+        pending = list(dict.fromkeys(utterances))
+        if self.process_workers:
+            # one shard of unique utterances per worker process
+            shards = [pending[i::self.process_workers]
+                      for i in range(min(self.process_workers, len(pending)))]
+            futures = [self.process_pool.submit(_worker_spoken_answers_batch,
+                                                shard, context)
+                       for shard in shards]
+            for shard, future in zip(shards, futures):
+                answers.update(zip(shard, future.result()))
+            return [answers.get(u) for u in utterances]
+        lang = (context or {}).get("lang")
+        for name, module, _ in self._available_modules(lang):
+            if not pending:
+                break
+            if not self._allow(name):
+                continue
+            try:
+                if hasattr(module, "spoken_answer_batch"):
+                    batch = module.spoken_answer_batch(pending,
+                                                       dict(context or {}))
+                else:
+                    # plain ovos QuestionSolver plugins answer one by one
+                    batch = [module.spoken_answer(u, dict(context or {}))
+                             for u in pending]
+            except Exception as e:
+                self._record(name, e)
+                continue
+            self._record(name)
+            answers.update((u, a) for u, a in zip(pending, batch) if a)
+            pending = [u for u in pending if u not in answers]
+        return [answers.get(u) for u in utterances]
+
+    def _parallel_answer(self, method, utterance, context=None,
+                         timeout=None):
+        deadline = monotonic() + timeout if timeout is not None else None
+        modules, context = self._route(utterance, context, translate=True)
+        calls = []
+        for name, module, _ in modules:
+            try:
+                # solvers modify context, each thread gets its own copy
+                calls.append(self._submit(name, getattr(module, method),
+                                          utterance, dict(context)))
+            except _Queued:
+                self.breakers[name].release()
+                calls.append(None)
+        futures = [call.future for call in calls if call is not None]
+        try:
+            # wait in priority order, a lower priority answer is only
+            # accepted once all higher priority solvers came up empty
+            for (name, _, solver_timeout), call in zip(modules, calls):
+                if call is None:
+                    continue
+                try:
+                    ans = self._result(call, solver_timeout, deadline)
+                except _Queued:
+                    self.breakers[name].release()
+                    if deadline is not None and monotonic() >= deadline:
+                        return self._best_done_answer(futures)
+                    continue
+                except TimeoutError as e:
+                    if deadline is not None and monotonic() >= deadline:
+                        LOG.warning(f"solvers did not answer within "
+                                    f"{timeout} seconds")
+                        return self._best_done_answer(futures)
+                    self._record(name, e)
+                    continue
+                except Exception as e:
+                    self._record(name, e)
+                    continue
+                self._record(name)
                 if ans:
                     return ans
-            except:
-                pass
+        finally:
+            for (name, _, _), call in zip(modules, calls):
+                if call is not None and call.future.cancel():
+                    # never ran, a half open trial can go to the next request
+                    self.breakers[name].release()
+
+    async def aspoken_answers(self, utterance, context=None, parallel=None,
+                              timeout=None):
+        """ async version of self.spoken_answers """
+        return await self._aanswer("spoken_answer", utterance, context,
+                                   parallel, timeout)
+
+    async def asearch(self, utterance, context=None, parallel=None,
+                      timeout=None):
+        """ async version of self.search """
+        return await self._aanswer("search", utterance, context, parallel,
+                                   timeout)
+
+    async def along_answer(self, utterance, context=None, parallel=None,
+                           timeout=None):
+        """ async version of self.long_answer """
+        return await self._aanswer("long_answer", utterance, context,
+                                   parallel, timeout)
+
+    async def _aanswer(self, method, utterance, context=None, parallel=None,
+                       timeout=None):
+        if self.process_workers:
+            return await asyncio.wrap_future(self.process_pool.submit(
+                _worker_answer, method, utterance, context, parallel,
+                timeout))
+        if parallel is None:
+            parallel = self.config.get("parallel", False)
+        if timeout is None:
+            timeout = self.config.get("timeout")
+        if parallel:
+            return await self._aparallel_answer(method, utterance, context,
+                                                timeout)
+        deadline = monotonic() + timeout if timeout is not None else None
+        modules, context = self._route(utterance, context)
+        for name, module, solver_timeout in modules:
+            if not self._allow(name):
+                continue
+            wait = self._wait_time(monotonic(), solver_timeout, deadline)
+            try:
+                ans = await asyncio.wait_for(
+                    self._acall(name, module, method, utterance,
+                                dict(context)),
+                    wait)
+            except _Queued:
+                self.breakers[name].release()
+                if deadline is not None and monotonic() >= deadline:
+                    break
+                continue
+            except Exception as e:
+                self._record(name, e)
+                if deadline is not None and monotonic() >= deadline:
+                    break
+                continue
+            self._record(name)
+            if ans:
+                return ans
+
+    async def _acall(self, name, module, method, utterance, context):
+        """ answer with the async version of method, solvers without one,
+        eg. plain ovos QuestionSolver plugins, run in their own threads """
+        amethod = getattr(module, "a" + method, None)
+        if amethod is not None:
+            return await amethod(utterance, context)
+        call = self._submit(name, getattr(module, method), utterance, context)
+        return await asyncio.wrap_future(call.future)
+
+    async def _aparallel_answer(self, method, utterance, context=None,
+                                timeout=None):
+        start = monotonic()
+        deadline = start + timeout if timeout is not None else None
+        # translating blocks, done once in the executor for all solvers
+        modules, context = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._route, utterance, context, True)
+        tasks = [asyncio.ensure_future(
+            self._acall(name, module, method, utterance, dict(context)))
+            for name, module, _ in modules]
+        try:
+            for (name, _, solver_timeout), task in zip(modules, tasks):
+                wait = self._wait_time(start, solver_timeout, deadline)
+                try:
+                    ans = await asyncio.wait_for(asyncio.shield(task), wait)
+                except _Queued:
+                    self.breakers[name].release()
+                    continue
+                except asyncio.TimeoutError as e:
+                    if deadline is not None and monotonic() >= deadline:
+                        LOG.warning(f"solvers did not answer within "
+                                    f"{timeout} seconds")
+                        return self._best_done_answer(tasks)
+                    self._record(name, e)
+                    continue
+                except Exception as e:
+                    self._record(name, e)
+                    continue
+                self._record(name)
+                if ans:
+                    return ans
+        finally:
+            for (name, _, _), task in zip(modules, tasks):
+                if not task.done():
+                    task.cancel()
+                    # no outcome, a half open trial can go to the next request
+                    self.breakers[name].release()
+
+    # bus api
+    def bind(self, bus):
+        """
+        answer requests received on the bus, each request is replied to with
+        a "<msg_type>.response" message carrying the same "request_id"
+        """
+        self.bus = bus
+        for msg_type in self.BUS_REQUESTS:
+            bus.on(msg_type, self.handle_bus_request)
+
+    @property
+    def bus_executor(self):
+        if self._bus_executor is None:
+            self._bus_executor = ThreadPoolExecutor(
+                max_workers=self.config.get("bus_workers", 4),
+                thread_name_prefix="neon_solvers_bus")
+        return self._bus_executor
+
+    def handle_bus_request(self, message):
+        request_id = message.data.get("request_id") or str(uuid4())
+        with self._bus_lock:
+            busy = self._bus_pending >= self.config.get("bus_queue_size", 64)
+            if not busy:
+                self._bus_pending += 1
+        if busy:
+            # reject instead of queueing requests we can not answer in time
+            LOG.warning(f"too many pending requests, rejecting {request_id}")
+            self._bus_reply(message, request_id, error="busy")
+            return
+        self.bus_executor.submit(self._answer_bus_request, message,
+                                 request_id)
+
+    def _answer_bus_request(self, message, request_id):
+        try:
+            method = self.BUS_REQUESTS[message.msg_type]
+            context = {"lang": message.data.get("lang"),
+                       "request_id": request_id}
+            answer = self._answer(method, message.data["utterance"], context)
+            self._bus_reply(message, request_id, answer=answer)
+        except Exception as e:
+            LOG.exception(f"failed to answer {request_id}")
+            self._bus_reply(message, request_id, error=str(e))
+        finally:
+            with self._bus_lock:
+                self._bus_pending -= 1
+
+    def _bus_reply(self, message, request_id, answer=None, error=None):
+        data = {"utterance": message.data.get("utterance"),
+                "request_id": request_id,
+                "answer": answer}
+        if error:
+            data["error"] = error
+        if self.bus is not None:
+            self.bus.emit(message.reply(f"{message.msg_type}.response", data))
+
+    @staticmethod
+    def _best_done_answer(futures):
+        for future in futures:
+            if future.done() and not future.cancelled() and \
+                    not future.exception():
+                ans = future.result()
+                if ans:
+                    return ans
+
+
+# process pool workers, each process runs its own NeonSolversService
+_WORKER_SERVICE = None
+
+
+def _solver_entry_points():
+    """ {name: entry point} of the installed question solver plugins, only
+    the configured ones are imported, see NeonSolversService.load_plugins """
+    from importlib.metadata import entry_points
+    from ovos_plugin_manager.utils import PluginTypes
+    installed = {}
+    # plugins may still use the deprecated neon entry point group
+    for group in ("neon.plugin.solver", PluginTypes.QUESTION_SOLVER.value):
+        for entry_point in entry_points(group=group):
+            installed[entry_point.name] = entry_point
+    return installed
+
+
+def _init_worker(config):
+    global _WORKER_SERVICE
+    # caches are shared with the other processes, json caches would
+    # overwrite each other, also when configured by a plugin
+    os.environ["NEON_SOLVERS_CACHE_BACKEND"] = "sqlite"
+    require_shared_backends()
+    _WORKER_SERVICE = NeonSolversService(None, config)
+    Finalize(None, _WORKER_SERVICE.shutdown, exitpriority=10)
+
+
+def _worker_answer(method, utterance, context=None, parallel=None,
+                   timeout=None):
+    return _WORKER_SERVICE._answer(method, utterance, context, parallel,
+                                   timeout)
+
+
+def _worker_spoken_answers_batch(utterances, context=None):
+    return _WORKER_SERVICE.spoken_answers_batch(utterances, context)
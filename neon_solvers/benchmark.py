@@ -0,0 +1,364 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+benchmarks for the solver and service hot paths
+
+runs mock solvers with a fake translator, both with configurable latency,
+and reports throughput and latency percentiles as json
+
+    python -m neon_solvers.benchmark --sizes 1000 100000 --output bench.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from tempfile import mkdtemp
+from time import perf_counter, sleep
+from uuid import uuid4
+
+from neon_solvers.cache import BoundedCache, MemoryCache, get_cache_backend
+from neon_solvers.compression import ZlibCodec, build_dictionary, \
+    cache_footprint, current_rss
+from neon_solvers.solver import AbstractSolver
+
+METHODS = ("search", "spoken_answer", "long_answer", "service")
+
+
+class FakeTranslator:
+    """ returns the text unchanged after sleeping for latency seconds """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def translate(self, text, target=None, source=None):
+        self.calls += 1
+        if self.latency:
+            sleep(self.latency)
+        return text
+
+
+class BenchSolver(AbstractSolver):
+    """ answers every query after sleeping for latency seconds """
+
+    def __init__(self, latency=0.0, priority=50, config=None):
+        config = {"lang": "en", "cache_backend": "memory", **(config or {})}
+        super().__init__(name=f"bench_{uuid4().hex[:8]}", priority=priority,
+                         config=config)
+        self.latency = latency
+
+    def _wait(self):
+        if self.latency:
+            sleep(self.latency)
+
+    def get_spoken_answer(self, query, context=None):
+        self._wait()
+        return f"the answer to {query}. it was computed by a mock solver."
+
+    def get_data(self, query, context=None):
+        self._wait()
+        return {"short_answer": f"the answer to {query}",
+                "source": "benchmark"}
+
+    def get_image(self, query, context=None):
+        self._wait()
+        return "http://stock.image.jpg"
+
+    def get_expanded_answer(self, query, context=None):
+        self._wait()
+        return [{"title": query, "summary": f"step {i} of {query}",
+                 "img": None} for i in range(3)]
+
+
+def percentile(values, pct):
+    """ nearest rank percentile of a sorted list """
+    if not values:
+        return None
+    rank = max(int(round(pct / 100 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def _prefill(solver, size, backend=None, folder=None):
+    """ replace the solver caches with caches holding size entries,
+    returns the cached queries """
+    queries = [f"cached question number {i}" for i in range(size)]
+    data = get_cache_backend(solver.name + "_data", backend, folder)
+    data.update({q: {"short_answer": f"the answer to {q}",
+                     "source": "benchmark"} for q in queries})
+    spoken = get_cache_backend(solver.name, backend, folder)
+    spoken.update({q: f"the answer to {q}. it was computed by a mock solver."
+                   for q in queries})
+    for cache in (data, spoken):
+        cache.store()
+    solver.cache = BoundedCache(data)
+    solver.spoken_cache = BoundedCache(spoken)
+    solver.translation_cache = BoundedCache(
+        get_cache_backend(solver.name + "_translations", backend, folder))
+    return queries
+
+
+def _make_service(solvers, config=None):
+    from neon_solvers import NeonSolversService
+    from neon_solvers.breaker import CircuitBreaker
+    service = NeonSolversService(bus=None, config={
+        "solvers": {"lazy_load": True, **(config or {})}})
+    for solver in solvers:
+        service.loaded_modules[solver.name] = solver
+        service.breakers[solver.name] = CircuitBreaker()
+    service._plugins_loaded = True
+    return service
+
+
+def run_scenario(method="spoken_answer", cache_size=1000, warm=False,
+                 translated=False, concurrency=1, requests=200,
+                 latency=0.001, tx_latency=0.001, backend=None, seed=0,
+                 parallel=False):
+    """
+    answer requests queries and measure each call
+
+    warm - queries and their translations are already cached, otherwise
+           every query is a miss
+    translated - queries are asked in a language the solver does not
+                 support, answers are translated back
+    concurrency - number of threads sending queries, 1 is sequential
+    parallel - the "service" method queries all solvers at once, see
+               NeonSolversService.spoken_answers
+    """
+    folder = mkdtemp() if backend not in (None, "memory") else None
+    backend = backend or "memory"
+    solvers = [BenchSolver(latency, priority=p) for p in (90, 50)]
+    translator = FakeTranslator(tx_latency)
+    cached = []
+    for solver in solvers:
+        solver.translator = translator
+        cached = _prefill(solver, cache_size, backend, folder)
+
+    rand = random.Random(seed)
+    if warm:
+        queries = rand.sample(cached, min(requests, len(cached)))
+        queries += rand.choices(cached, k=requests - len(queries))
+    else:
+        run = uuid4().hex[:8]
+        queries = [f"new question {run} {i}" for i in range(requests)]
+    context = {"lang": "pt" if translated else "en"}
+
+    if method == "service":
+        service = _make_service(solvers)
+
+        def answer(query, context):
+            return service.spoken_answers(query, context, parallel=parallel)
+    else:
+        service = None
+        answer = getattr(solvers[0], method)
+
+    if warm:
+        # fill the translation caches, but measure persistent cache hits
+        # rather than the in memory cache of final answers
+        for query in dict.fromkeys(queries):
+            answer(query, dict(context))
+        for solver in solvers:
+            solver.memory_cache.clear()
+        translator.calls = 0
+
+    def timed(query):
+        start = perf_counter()
+        answer(query, dict(context))
+        return perf_counter() - start
+
+    start = perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(timed, queries))
+    else:
+        latencies = [timed(q) for q in queries]
+    wall = perf_counter() - start
+
+    if service is not None:
+        service.shutdown()
+    for solver in solvers:
+        solver.shutdown()
+
+    latencies.sort()
+    return {"method": method,
+            "cache_size": cache_size,
+            "cache": "warm" if warm else "cold",
+            "translated": translated,
+            "dispatch": "concurrent" if concurrency > 1 else "sequential",
+            "parallel": parallel,
+            "concurrency": concurrency,
+            "backend": backend,
+            "requests": requests,
+            "seconds": wall,
+            "throughput": requests / wall if wall else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": sum(latencies) / len(latencies) if latencies else None,
+            "translator_calls": translator.calls}
+
+
+def raw_api_response(query, i=0):
+    """ a get_data payload shaped like a verbose upstream api response """
+    return {"short_answer": f"the answer to {query}",
+            "source": "benchmark",
+            "raw": {"Heading": query.title(),
+                    "AbstractURL": f"https://example.com/wiki/{i}",
+                    "AbstractSource": "Wikipedia",
+                    "Image": f"https://example.com/images/{i}.png",
+                    "Infobox": {"content": [
+                        {"label": f"field {j}", "value": f"value {i}.{j}",
+                         "data_type": "string", "wiki_order": j}
+                        for j in range(8)]},
+                    "RelatedTopics": [
+                        {"FirstURL": f"https://example.com/topic/{i}/{j}",
+                         "Text": f"related topic {j} of {query}"}
+                        for j in range(6)]}}
+
+
+FOOTPRINT_VARIANTS = {
+    "plain": {},
+    "compressed": {"compression": True},
+    "compressed_dictionary": {"compression": True, "dictionary": True},
+    "fields": {"cache_fields": ["short_answer", "source"]},
+}
+
+
+def run_footprint(size=1000, compression=False, dictionary=False,
+                  cache_fields=None):
+    """
+    fill a cache with size get_data payloads, returns stored bytes and the
+    process rss before and after
+    """
+    codec = None
+    if compression:
+        zdict = None
+        if dictionary:
+            zdict = build_dictionary(
+                [raw_api_response(f"sample question {i}", i)
+                 for i in range(100)])
+        codec = ZlibCodec(zdict=zdict)
+    cache = BoundedCache(MemoryCache(), codec=codec)
+    rss_before = current_rss()
+    for i in range(size):
+        data = raw_api_response(f"question number {i}", i)
+        if cache_fields is not None:
+            data = {k: v for k, v in data.items() if k in cache_fields}
+        cache[f"question number {i}"] = data
+    rss_after = current_rss()
+    result = cache_footprint(cache)
+    result.update({"cache_size": size,
+                   "compression": bool(compression),
+                   "dictionary": bool(dictionary),
+                   "cache_fields": cache_fields,
+                   "rss_before": rss_before,
+                   "rss_after": rss_after,
+                   "rss_delta": rss_after - rss_before
+                   if rss_before is not None else None})
+    return result
+
+
+def run_benchmarks(methods=METHODS, sizes=(1000, 10000, 100000),
+                   requests=200, concurrency=8, latency=0.001,
+                   tx_latency=0.001, backend=None,
+                   footprint_sizes=(1000, 10000)):
+    """ run every combination of method, cache size, cold/warm cache,
+    translated/untranslated and sequential/concurrent dispatch, the
+    service both querying solvers one by one and in parallel, then
+    measure cache footprint with and without compression """
+    results = []
+    for method, size, warm, translated, workers in product(
+            methods, sizes, (False, True), (False, True),
+            (1, concurrency)):
+        for parallel in ((False, True) if method == "service" else (False,)):
+            results.append(run_scenario(method, size, warm, translated,
+                                        workers, requests, latency,
+                                        tx_latency, backend,
+                                        parallel=parallel))
+    footprint = []
+    for size, (variant, options) in product(footprint_sizes,
+                                             FOOTPRINT_VARIANTS.items()):
+        footprint.append({"variant": variant,
+                          **run_footprint(size, **options)})
+    return {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "version": _version(),
+            "settings": {"requests": requests,
+                         "concurrency": concurrency,
+                         "latency": latency,
+                         "tx_latency": tx_latency,
+                         "backend": backend or "memory"},
+            "results": results,
+            "footprint": footprint}
+
+
+def _version():
+    try:
+        from importlib.metadata import version
+        return version("neon_solvers")
+    except Exception:
+        return None
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="benchmark neon_solvers hot paths")
+    parser.add_argument("--methods", nargs="+", default=list(METHODS),
+                        choices=METHODS)
+    parser.add_argument("--sizes", nargs="+", type=int,
+                        default=[1000, 10000, 100000],
+                        help="cached entries per cache, eg. 1000 1000000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.001,
+                        help="seconds each mock solver call takes")
+    parser.add_argument("--tx-latency", type=float, default=0.001,
+                        help="seconds each fake translation takes")
+    parser.add_argument("--backend", default="memory",
+                        help="cache backend, memory, sqlite or json")
+    parser.add_argument("--footprint-sizes", nargs="+", type=int,
+                        default=[1000, 10000],
+                        help="cached get_data payloads for the size report")
+    parser.add_argument("--output", help="write json results to this file")
+    args = parser.parse_args(args)
+    report = run_benchmarks(args.methods, args.sizes, args.requests,
+                            args.concurrency, args.latency, args.tx_latency,
+                            args.backend, args.footprint_sizes)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from threading import Lock
+from time import monotonic
+
+
+class CircuitBreaker:
+    """
+    skip a failing solver for a while instead of retrying it on every request
+
+    after max_failures consecutive failures (errors or timeouts) the breaker
+    opens and allow() returns False for cooldown seconds, then a single trial
+    request is let through, success closes the breaker again and another
+    failure re-opens it
+    """
+
+    def __init__(self, max_failures=3, cooldown=60):
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self._open_until = 0
+        # a half open trial request is in flight
+        self._trial = False
+        self._lock = Lock()
+
+    @property
+    def is_open(self):
+        return self.failures >= self.max_failures and \
+            monotonic() < self._open_until
+
+    def allow(self):
+        with self._lock:
+            if self.failures < self.max_failures:
+                return True
+            if monotonic() < self._open_until:
+                return False
+            # half open, let one request through before opening again
+            self._open_until = monotonic() + self.cooldown
+            self._trial = True
+            return True
+
+    def release(self):
+        """ give back a half open trial that ended up not being used """
+        with self._lock:
+            if self._trial:
+                self._trial = False
+                self._open_until = 0
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._open_until = 0
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.max_failures:
+                self._open_until = monotonic() + self.cooldown
@@ -0,0 +1,878 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import atexit
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from os import makedirs
+from os.path import join, isdir
+from threading import Event, Lock, RLock, Thread
+from weakref import WeakSet
+
+from ovos_utils.log import LOG
+from ovos_utils.xdg_utils import xdg_cache_home
+
+# marks a pending removal in a write behind cache
+_DELETED = object()
+# write behind caches with a flusher thread, flushed at exit
+_FLUSHING_CACHES = WeakSet()
+# key of the dict wrapping a value together with its write time
+TIMESTAMP_KEY = "~ts"
+
+
+def _is_stamped(value):
+    return isinstance(value, dict) and TIMESTAMP_KEY in value and \
+        "v" in value
+
+
+def unstamp(value):
+    """ value without the write time BoundedCache stores with it """
+    return value["v"] if _is_stamped(value) else value
+
+
+class SQLiteCache:
+    """
+    persistent python dict backed by a sqlite table
+
+    unlike JsonStorage every entry is read and written individually,
+    nothing is loaded into memory at startup and store() is a no-op
+
+    write and access times are kept in the table, BoundedCache uses them
+    for expiry and LRU eviction instead of tracking entries in memory,
+    access times are written in batches, see access()
+
+    the database is in WAL mode and can be shared by several processes
+    """
+    # entries may be written or removed by other processes
+    shared = True
+
+    def __init__(self, name, xdg_folder=None, subfolder="neon_solvers",
+                 extension="sqlite"):
+        self.name = name
+        folder = join(xdg_folder or xdg_cache_home(), subfolder)
+        if not isdir(folder):
+            makedirs(folder, exist_ok=True)
+        self.path = join(folder, f"{name}.{extension}")
+        self.lock = RLock()
+        # wait for writes from other processes instead of failing
+        self._conn = sqlite3.connect(self.path, check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache "
+                           "(key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                           "ts REAL, atime REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_atime "
+                           "ON cache (atime)")
+        # running entry count and size, only computed once evict() needs
+        # them, writes by other processes are not included
+        self._count = None
+        self._bytes = None
+
+    def _execute(self, sql, args=()):
+        with self.lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def __contains__(self, key):
+        return bool(self._execute("SELECT 1 FROM cache WHERE key = ?",
+                                  (key,)))
+
+    def __getitem__(self, key):
+        rows = self._execute("SELECT value FROM cache WHERE key = ?", (key,))
+        if not rows:
+            raise KeyError(key)
+        return json.loads(rows[0][0])
+
+    def __setitem__(self, key, value):
+        value = json.dumps(value)
+        now = time.time()
+        with self.lock:
+            self._track(key, len(key) + len(value))
+            self._execute("INSERT OR REPLACE INTO cache (key, value, ts, "
+                          "atime) VALUES (?, ?, ?, ?)", (key, value, now, now))
+
+    def __delitem__(self, key):
+        with self.lock:
+            if key not in self:
+                raise KeyError(key)
+            self._track(key, None)
+            self._execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def __len__(self):
+        return self._execute("SELECT COUNT(*) FROM cache")[0][0]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, *args):
+        with self.lock:
+            try:
+                value = self[key]
+            except KeyError:
+                if args:
+                    return args[0]
+                raise
+            del self[key]
+            return value
+
+    def keys(self):
+        return [r[0] for r in self._execute("SELECT key FROM cache")]
+
+    def values(self):
+        return [json.loads(r[0])
+                for r in self._execute("SELECT value FROM cache")]
+
+    def items(self):
+        return [(r[0], json.loads(r[1]))
+                for r in self._execute("SELECT key, value FROM cache")]
+
+    def update(self, entries):
+        entries = {k: json.dumps(v) for k, v in dict(entries).items()}
+        with self.lock:
+            self._conn.execute("BEGIN")
+            try:
+                now = time.time()
+                for key, value in entries.items():
+                    self._track(key, len(key) + len(value))
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO cache (key, value, ts, atime) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(k, v, now, now) for k, v in entries.items()])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                # totals might be off, recomputed when needed
+                self._count = self._bytes = None
+                raise
+
+    def timestamp(self, key):
+        """ return the write time of key, None if missing """
+        rows = self._execute("SELECT ts FROM cache WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def timestamps(self):
+        """ return {key: write time} for all entries, oldest first """
+        return OrderedDict(self._execute("SELECT key, ts FROM cache "
+                                         "ORDER BY ts"))
+
+    def access(self, times):
+        """ mark entries as recently used, times is {key: access time} """
+        with self.lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "UPDATE cache SET atime = ? WHERE key = ?",
+                    [(t, k) for k, t in times.items()])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _track(self, key, size):
+        """ update the running totals before key is written with size or
+        removed (size None), caller holds self.lock """
+        if self._count is None and self._bytes is None:
+            return
+        rows = self._conn.execute("SELECT length(key) + length(value) "
+                                  "FROM cache WHERE key = ?",
+                                  (key,)).fetchall()
+        count = (size is not None) - bool(rows)
+        size = (size or 0) - (rows[0][0] if rows else 0)
+        if self._count is not None:
+            self._count += count
+        if self._bytes is not None:
+            self._bytes += size
+
+    def usage(self, size=False):
+        """ returns (entries, total size or None), size is computed only
+        if asked for, see evict() """
+        with self.lock:
+            if self._count is None:
+                self._count = len(self)
+            if size and self._bytes is None:
+                self._bytes = self._execute(
+                    "SELECT COALESCE(SUM(length(key) + length(value)), 0) "
+                    "FROM cache")[0][0]
+            return self._count, self._bytes
+
+    def evict(self, max_entries=None, max_bytes=None):
+        """
+        remove the least recently used entries until at most max_entries
+        are left and their total size is at most max_bytes, entry sizes are
+        the length of the key and json value, returns the removed keys
+        """
+        def within_limits():
+            return (max_entries is None or count <= max_entries) and \
+                (max_bytes is None or size <= max_bytes)
+
+        with self.lock:
+            count, size = self.usage(max_bytes is not None)
+            if within_limits():
+                return []
+            removed = []
+            cursor = self._conn.execute("SELECT key, length(key) + "
+                                        "length(value) FROM cache "
+                                        "ORDER BY atime")
+            for key, entry_size in cursor:
+                if within_limits():
+                    break
+                removed.append(key)
+                count -= 1
+                if size is not None:
+                    size -= entry_size
+            cursor.close()
+            if removed:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("DELETE FROM cache WHERE key = ?",
+                                       [(k,) for k in removed])
+                self._conn.execute("COMMIT")
+                self._count, self._bytes = count, size
+            return removed
+
+    def clear(self):
+        with self.lock:
+            self._execute("DELETE FROM cache")
+            self._count = 0 if self._count is not None else None
+            self._bytes = 0 if self._bytes is not None else None
+
+    def store(self):
+        """ entries are committed as they are written, nothing to flush """
+        pass
+
+    def close(self):
+        with self.lock:
+            self._conn.close()
+
+
+class BoundedCache:
+    """
+    dict like wrapper around a cache backend adding LRU eviction and expiry
+
+    max_entries - max number of entries kept in the cache
+    max_bytes - max size of the json serialized entries
+    ttl - seconds an entry is valid for after being written
+
+    without limits every call goes straight to the backend, nothing is
+    tracked in memory, backends keeping their own write and access times
+    (see SQLiteCache.evict) are also bounded without loading any entry,
+    other backends get write times stored with each entry so expiry
+    survives restarts, {"~ts": write time, "v": value}
+
+    membership tests ("key in cache") are counted as lookups in self.stats
+
+    listeners added with add_listener are called as listener(key, present)
+    whenever an entry is written or removed, including evictions, key is
+    None when the cache is cleared
+
+    flush_interval enables write behind mode, writes and removals are kept
+    in memory and applied to the backend in bulk by a background thread
+    every flush_interval seconds or once max_pending changes are waiting,
+    store() no longer blocks and flush() or close() drain pending changes
+
+    codec compresses values before they are written to the backend, see
+    neon_solvers.compression.ZlibCodec, max_bytes then counts compressed
+    sizes, entries it can not decode (eg. after the compression dictionary
+    changed) are removed and treated as missing
+    """
+
+    def __init__(self, backend, max_entries=None, max_bytes=None, ttl=None,
+                 flush_interval=None, max_pending=100, codec=None):
+        self.backend = backend
+        self.codec = codec
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.lock = RLock()
+        # key -> value or _DELETED, waiting for / being written to backend
+        self._pending = {}
+        self._flushing = {}
+        self._flush_lock = Lock()
+        self._flush_event = Event()
+        self._flusher = None
+        self._closed = False
+        self.flushes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.undecodable = 0
+        # keys whose backend value is known to decode with codec
+        self._decodable = set()
+        self._bytes = 0
+        self._listeners = []
+        bounded = any(limit is not None
+                      for limit in (max_entries, max_bytes, ttl))
+        # the backend tracks write / access times and sizes itself
+        self._native = bounded and hasattr(backend, "evict")
+        # key -> access time not yet written to a native backend, reads
+        # never write, access times are written before evicting
+        self._accessed = {}
+        # otherwise key -> [write timestamp, size in bytes], least recently
+        # used first, None when there is nothing to enforce
+        self._meta = OrderedDict() if bounded and not self._native \
+            else None
+        # write times are stored with the entries
+        self._stamped = self._meta is not None and \
+            getattr(backend, "persistent", True)
+        if self._meta is not None:
+            self._load_meta()
+        elif self._native:
+            self._evict()
+
+    def _load_meta(self):
+        now = time.time()
+        entries = []
+        # values are only read if needed, json backends hold them in
+        # memory anyway
+        read = self._stamped or self.max_bytes is not None
+        for key in self.backend.keys():
+            ts, size = now, 0
+            if read:
+                value = self.backend[key]
+                if _is_stamped(value):
+                    ts = value[TIMESTAMP_KEY]
+                if self.max_bytes is not None:
+                    size = self._sizeof(key, unstamp(value))
+            # written before timestamps were stored, age counted from now
+            entries.append((ts, key, size))
+        # least recently written first
+        entries.sort(key=lambda e: e[0])
+        for ts, key, size in entries:
+            self._meta[key] = [ts, size]
+            self._bytes += size
+        self._evict()
+
+    @staticmethod
+    def _sizeof(key, value):
+        return len(key) + len(json.dumps(value, ensure_ascii=False))
+
+    @property
+    def write_behind(self):
+        return self.flush_interval is not None
+
+    def _encode(self, value):
+        if self.codec is None:
+            return value
+        return self.codec.encode(value)
+
+    def _changed(self, key):
+        """ pending value of key, None if unchanged, _DELETED if removed """
+        for changes in (self._pending, self._flushing):
+            if key in changes:
+                return changes[key]
+        return None
+
+    def _write_time(self, key):
+        """ write time of key, None if not cached, expired or not """
+        if self._meta is not None:
+            self._sync(key)
+            entry = self._meta.get(key)
+            return entry[0] if entry is not None else None
+        change = self._changed(key)
+        if change is not None:
+            # written since the last flush, never expired
+            return None if change is _DELETED else time.time()
+        if self._native:
+            return self.backend.timestamp(key)
+        return 0 if key in self.backend else None
+
+    def _expired(self, ts):
+        return self.ttl is not None and time.time() - ts > self.ttl
+
+    def _used(self, key):
+        """ mark key as recently used """
+        if self._meta is not None:
+            self._meta.move_to_end(key)
+        elif self._native and self._changed(key) is None:
+            self._accessed[key] = time.time()
+
+    def _store_access(self):
+        """ write the access times kept in memory to a native backend """
+        if self._accessed:
+            accessed, self._accessed = self._accessed, {}
+            self.backend.access(accessed)
+
+    def _read(self, key):
+        change = self._changed(key)
+        if change is _DELETED:
+            raise KeyError(key)
+        if change is not None:
+            return change
+        value = unstamp(self.backend[key])
+        if self.codec is None:
+            return value
+        try:
+            value = self.codec.decode(value)
+        except Exception as e:
+            # eg. compressed with another dictionary, a miss from now on
+            LOG.warning(f"dropping undecodable cached {key}: {e}")
+            self._remove(key)
+            self.undecodable += 1
+            raise KeyError(key)
+        self._decodable.add(key)
+        return value
+
+    def _decodes(self, key):
+        """ check that the value of key can be read, undecodable entries
+        are removed, values are only decoded once per process """
+        if self.codec is None or key in self._decodable or \
+                self._changed(key) is not None:
+            return True
+        try:
+            self._read(key)
+        except KeyError:
+            return False
+        return True
+
+    def _to_backend(self, key, value, encoded=None):
+        """ value as written to the backend """
+        value = encoded if encoded is not None else self._encode(value)
+        if self._stamped:
+            ts = self._meta[key][0] if key in self._meta else time.time()
+            value = {TIMESTAMP_KEY: ts, "v": value}
+        return value
+
+    def _write(self, key, value, encoded=None):
+        # written entries get a new access time from the backend
+        self._accessed.pop(key, None)
+        if self.codec is not None and value is not _DELETED:
+            self._decodable.add(key)
+        if not self.write_behind:
+            if value is _DELETED:
+                self.backend.pop(key, None)
+            else:
+                self.backend[key] = self._to_backend(key, value, encoded)
+            return
+        self._pending[key] = value
+        if self.max_pending and len(self._pending) >= self.max_pending:
+            self._start_flusher()
+            self._flush_event.set()
+
+    def _track(self, key, ts, size):
+        if self._meta is None:
+            return
+        if key in self._meta:
+            self._bytes -= self._meta.pop(key)[1]
+        self._meta[key] = [ts, size]
+        self._bytes += size
+
+    def _remove(self, key):
+        if self._meta is not None:
+            _, size = self._meta.pop(key)
+            self._bytes -= size
+        self._decodable.discard(key)
+        self._write(key, _DELETED)
+        self._notify(key, False)
+
+    def _notify(self, key, present):
+        for listener in self._listeners:
+            try:
+                listener(key, present)
+            except Exception:
+                # a broken listener must not break the cache
+                pass
+
+    def add_listener(self, listener):
+        with self.lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self.lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _evict(self):
+        if self._native:
+            self._store_access()
+            for key in self.backend.evict(self.max_entries, self.max_bytes):
+                self._decodable.discard(key)
+                self.evictions += 1
+                self._notify(key, False)
+            return
+        if self._meta is None:
+            return
+        while self._meta and (
+                (self.max_entries is not None and
+                 len(self._meta) > self.max_entries) or
+                (self.max_bytes is not None and
+                 self._bytes > self.max_bytes)):
+            key = next(iter(self._meta))
+            self._remove(key)
+            self.evictions += 1
+
+    @property
+    def stats(self):
+        if self._native:
+            entries, size = self.backend.usage(self.max_bytes is not None)
+        else:
+            entries, size = len(self), self._bytes
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "undecodable": self.undecodable,
+                "entries": entries,
+                "bytes": size or 0}
+
+    def _sync(self, key):
+        """ shared backends can be modified by other processes, pick up
+        entries written there and forget entries removed there """
+        if not getattr(self.backend, "shared", False) or \
+                key in self._pending or key in self._flushing:
+            return
+        ts = self.backend.timestamp(key)
+        if ts is None:
+            if key in self._meta:
+                self._bytes -= self._meta.pop(key)[1]
+                self._notify(key, False)
+            return
+        # entries written by this process are never newer than our metadata
+        if key not in self._meta or ts > self._meta[key][0]:
+            self._decodable.discard(key)
+            size = 0
+            if self.max_bytes is not None:
+                size = self._sizeof(key, unstamp(self.backend[key]))
+            self._track(key, ts, size)
+            self._notify(key, True)
+            self._evict()
+
+    def touch(self, key):
+        """
+        check if key is cached and mark it as recently used
+
+        unlike "key in cache" this never reads values from the backend and
+        is not counted as a lookup in self.stats
+        """
+        with self.lock:
+            ts = self._write_time(key)
+            if ts is None or self._expired(ts) or not self._decodes(key):
+                return False
+            self._used(key)
+            return True
+
+    def __contains__(self, key):
+        with self.lock:
+            ts = self._write_time(key)
+            if ts is not None and self._expired(ts):
+                self._remove(key)
+                self.expirations += 1
+                ts = None
+            if ts is not None and self._decodes(key):
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def __getitem__(self, key):
+        with self.lock:
+            ts = self._write_time(key)
+            if ts is None:
+                raise KeyError(key)
+            if self._expired(ts):
+                self._remove(key)
+                self.expirations += 1
+                raise KeyError(key)
+            self._used(key)
+            return self._read(key)
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            size = 0
+            encoded = None
+            if self.max_bytes is not None and self._meta is not None:
+                encoded = self._encode(value)
+                size = self._sizeof(key, encoded)
+            self._track(key, time.time(), size)
+            self._write(key, value, encoded)
+            self._notify(key, True)
+            self._evict()
+
+    def __delitem__(self, key):
+        with self.lock:
+            if self._write_time(key) is None:
+                raise KeyError(key)
+            self._remove(key)
+
+    def update(self, entries):
+        """ write many entries with a single bulk write to the backend """
+        entries = dict(entries)
+        with self.lock:
+            now = time.time()
+            for key, value in entries.items():
+                size = 0
+                if self.max_bytes is not None and self._meta is not None:
+                    size = self._sizeof(key, self._encode(value))
+                self._track(key, now, size)
+            if self.write_behind:
+                for key, value in entries.items():
+                    self._write(key, value)
+            else:
+                self.backend.update({k: self._to_backend(k, v)
+                                     for k, v in entries.items()})
+            for key in entries:
+                self._notify(key, True)
+            self._evict()
+
+    def __len__(self):
+        if self._meta is not None:
+            return len(self._meta)
+        with self.lock:
+            count = len(self.backend)
+            changes = {**self._flushing, **self._pending}
+            for key, value in changes.items():
+                count += (value is not _DELETED) - (key in self.backend)
+            return count
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, *args):
+        with self.lock:
+            try:
+                value = self[key]
+            except KeyError:
+                if args:
+                    return args[0]
+                raise
+            self._remove(key)
+            return value
+
+    def keys(self):
+        if self._meta is not None:
+            return list(self._meta)
+        with self.lock:
+            changes = {**self._flushing, **self._pending}
+            keys = [k for k in self.backend.keys()
+                    if changes.get(k) is not _DELETED]
+            known = set(keys)
+            return keys + [k for k, v in changes.items()
+                           if v is not _DELETED and k not in known]
+
+    def values(self):
+        with self.lock:
+            return [self._read(k) for k in self.keys()]
+
+    def items(self):
+        with self.lock:
+            return [(k, self._read(k)) for k in self.keys()]
+
+    def clear(self):
+        with self.lock:
+            self._pending.clear()
+            self._accessed.clear()
+            self._decodable.clear()
+            self.backend.clear()
+            if self._meta is not None:
+                self._meta.clear()
+            self._bytes = 0
+            self._notify(None, False)
+
+    def store(self):
+        """ persist changes, in write behind mode this only makes sure
+        the flusher thread is running and returns right away """
+        if self.write_behind:
+            self._start_flusher()
+            return
+        with self.lock:
+            self.backend.store()
+
+    def flush(self):
+        """ apply pending changes to the backend and persist it """
+        if not self.write_behind:
+            self.store()
+            return
+        with self._flush_lock:
+            with self.lock:
+                if not self._pending:
+                    return
+                self._flushing, self._pending = self._pending, {}
+                changes = self._flushing
+                writes = {k: self._to_backend(k, v)
+                          for k, v in changes.items() if v is not _DELETED}
+            try:
+                if writes:
+                    self.backend.update(writes)
+                for key, value in changes.items():
+                    if value is _DELETED:
+                        self.backend.pop(key, None)
+                self.backend.store()
+            except Exception:
+                with self.lock:
+                    # retry on the next flush unless overwritten meanwhile
+                    for key, value in changes.items():
+                        self._pending.setdefault(key, value)
+                raise
+            finally:
+                with self.lock:
+                    self._flushing = {}
+            self.flushes += 1
+            if self._native:
+                with self.lock:
+                    self._evict()
+
+    def _start_flusher(self):
+        with self.lock:
+            if self._flusher is not None or self._closed:
+                return
+            self._flusher = Thread(target=self._flush_loop, daemon=True,
+                                   name="neon_solvers_cache_flush")
+            _FLUSHING_CACHES.add(self)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                LOG.error(f"failed to flush cache: {e}")
+
+    def close(self):
+        """ stop the flusher thread, drain pending changes and close the
+        backend """
+        with self.lock:
+            self._closed = True
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            self._flush_event.set()
+            flusher.join()
+        if self.write_behind:
+            self.flush()
+        if self._native:
+            with self.lock:
+                self._store_access()
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            close()
+
+    def __getattr__(self, item):
+        # expose backend specific attributes, eg. path or close()
+        if item == "backend":
+            raise AttributeError(item)
+        return getattr(self.backend, item)
+
+
+class MemoryCache(dict):
+    """ non persistent cache backend """
+    # entries do not outlive the process, no need to store write times
+    persistent = False
+
+    def store(self):
+        pass
+
+
+@atexit.register
+def _flush_at_exit():
+    for cache in list(_FLUSHING_CACHES):
+        try:
+            cache.flush()
+        except Exception as e:
+            LOG.error(f"failed to flush cache: {e}")
+
+
+def _json_cache(name, xdg_folder=None):
+    from json_database import JsonStorageXDG
+    return JsonStorageXDG(name, xdg_folder=xdg_folder or xdg_cache_home(),
+                          subfolder="neon_solvers")
+
+
+def _sqlite_cache(name, xdg_folder=None):
+    return SQLiteCache(name, xdg_folder=xdg_folder)
+
+
+def _memory_cache(name, xdg_folder=None):
+    return MemoryCache()
+
+
+CACHE_BACKENDS = {
+    "memory": _memory_cache,
+    "json": _json_cache,
+    "sqlite": _sqlite_cache
+}
+
+# set in processes sharing cache files with other processes
+_REQUIRE_SHARED = False
+
+
+def require_shared_backends(required=True):
+    """
+    make get_cache_backend replace persistent backends that can not be
+    used by several processes at once (eg. "json", every process would
+    rewrite the same file) with sqlite, see NeonSolversService
+    process_workers
+    """
+    global _REQUIRE_SHARED
+    _REQUIRE_SHARED = required
+
+
+def get_cache_backend(name, backend=None, xdg_folder=None):
+    """
+    create a persistent cache for a solver
+
+    backend can be the name of a registered backend in CACHE_BACKENDS or a
+    callable accepting (name, xdg_folder) and returning a dict like object
+    with a store() method, defaults to the NEON_SOLVERS_CACHE_BACKEND
+    environment variable or "json"
+
+    after require_shared_backends() backends that can not be shared by
+    several processes are replaced with sqlite
+    """
+    backend = backend or os.environ.get("NEON_SOLVERS_CACHE_BACKEND") or \
+        "json"
+    if not callable(backend):
+        if backend not in CACHE_BACKENDS:
+            raise ValueError(f"unknown cache backend: {backend}")
+        backend = CACHE_BACKENDS[backend]
+    cache = backend(name, xdg_folder)
+    if _REQUIRE_SHARED and not getattr(cache, "shared", False) and \
+            getattr(cache, "persistent", True):
+        LOG.warning(f"{name} cache backend can not be shared by several "
+                    f"processes, using sqlite instead")
+        close = getattr(cache, "close", None)
+        if close is not None:
+            close()
+        cache = _sqlite_cache(name, xdg_folder)
+    return cache
@@ -0,0 +1,180 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import base64
+import json
+import os
+import re
+import zlib
+from collections import Counter
+
+from neon_solvers.cache import unstamp
+
+# key of the dict wrapping a compressed value in the cache backend
+ZLIB_KEY = "~zlib"
+
+
+class ZlibCodec:
+    """
+    compress cache values before they reach the cache backend
+
+    values are serialized as compact json and zlib compressed, stored as
+    {"~zlib": base64 data} so json and sqlite backends can hold them,
+    values smaller than min_size stay as they are and uncompressed values
+    written before compression was enabled can still be read
+
+    zdict is an optional shared dictionary, eg. from build_dictionary,
+    it improves compression of small values that share the same keys and
+    boilerplate, the same dictionary is needed to read them back
+    """
+
+    def __init__(self, level=6, zdict=None, min_size=128):
+        self.level = level
+        self.zdict = zdict or None
+        self.min_size = min_size
+        # entries compressed with another dictionary can not be decoded
+        self.dict_id = zlib.crc32(self.zdict) if self.zdict else None
+
+    @classmethod
+    def from_config(cls, config):
+        """ create a codec from a "cache_compression" config, True for
+        the defaults or a dict with level, dictionary (file path) and
+        min_size """
+        if not config:
+            return None
+        if config is True:
+            config = {}
+        zdict = None
+        if config.get("dictionary"):
+            with open(os.path.expanduser(config["dictionary"]), "rb") as f:
+                zdict = f.read()
+        return cls(level=config.get("level", 6), zdict=zdict,
+                   min_size=config.get("min_size", 128))
+
+    def _compressor(self):
+        if self.zdict:
+            return zlib.compressobj(self.level, zdict=self.zdict)
+        return zlib.compressobj(self.level)
+
+    def encode(self, value):
+        raw = json.dumps(value, ensure_ascii=False,
+                         separators=(",", ":")).encode("utf-8")
+        if len(raw) < self.min_size:
+            return value
+        compressor = self._compressor()
+        data = compressor.compress(raw) + compressor.flush()
+        if len(data) * 4 // 3 >= len(raw):
+            # not worth it once base64 encoded
+            return value
+        encoded = {ZLIB_KEY: base64.b64encode(data).decode("ascii")}
+        if self.dict_id is not None:
+            encoded["dict"] = self.dict_id
+        return encoded
+
+    @staticmethod
+    def is_encoded(value):
+        return isinstance(value, dict) and ZLIB_KEY in value
+
+    def decode(self, value):
+        if not self.is_encoded(value):
+            return value
+        if value.get("dict") != self.dict_id:
+            raise ValueError("value was compressed with another dictionary")
+        data = base64.b64decode(value[ZLIB_KEY])
+        if self.zdict:
+            decompressor = zlib.decompressobj(zdict=self.zdict)
+        else:
+            decompressor = zlib.decompressobj()
+        raw = decompressor.decompress(data) + decompressor.flush()
+        return json.loads(raw.decode("utf-8"))
+
+
+def build_dictionary(values, size=32 * 1024):
+    """
+    build a shared zlib dictionary from sample cache values
+
+    the most common json fragments of the samples are packed into size
+    bytes, most frequent last since zlib prefers recent matches
+    """
+    fragments = Counter()
+    for value in values:
+        raw = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        # split after structural characters, keeping keys and short strings
+        for part in re.split(r"(?<=[,{\[])", raw):
+            if 3 < len(part) < 256:
+                fragments[part] += 1
+    zdict = b""
+    for fragment, count in fragments.most_common():
+        if count < 2:
+            break
+        data = fragment.encode("utf-8")
+        if len(zdict) + len(data) > size:
+            break
+        zdict = data + zdict
+    return zdict
+
+
+def stored_size(value):
+    """ size of a value as written by a json backend """
+    return len(json.dumps(value, ensure_ascii=False))
+
+
+def cache_footprint(cache):
+    """ entries and json bytes of a cache before and after compression """
+    raw = stored = 0
+    codec = getattr(cache, "codec", None)
+    backend = getattr(cache, "backend", cache)
+    keys = cache.keys()
+    for key in keys:
+        value = backend.get(key)
+        if value is None:
+            # not written yet by a write behind cache
+            continue
+        stored += len(key) + stored_size(value)
+        value = unstamp(value)
+        if codec is not None:
+            value = codec.decode(value)
+        raw += len(key) + stored_size(value)
+    return {"entries": len(keys),
+            "raw_bytes": raw,
+            "stored_bytes": stored,
+            "ratio": stored / raw if raw else None}
+
+
+def current_rss():
+    """ resident set size of this process in bytes, None if unknown """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # peak rss, kilobytes on linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
@@ -0,0 +1,249 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import socket
+from collections import defaultdict
+from contextlib import nullcontext
+from threading import Lock
+from time import perf_counter
+
+# returned by span() when metrics are disabled, reusable
+_NO_SPAN = nullcontext()
+
+
+class MetricsSink:
+    """
+    receives per stage timings and counters from solvers
+
+    the base class discards everything and is the default, subclasses
+    set enabled = True and implement timing() and increment()
+
+    stages timed by AbstractSolver are tx_query, cache_lookup, backend,
+    store and tx_answer, counters are cache_hits, cache_misses,
+    backend_calls, translation_calls and errors, all tagged with the
+    solver name
+    """
+    enabled = False
+
+    def timing(self, name, seconds, tags=None):
+        pass
+
+    def increment(self, name, value=1, tags=None):
+        pass
+
+    def span(self, name, tags=None):
+        """ context manager timing its block as name, exceptions raised
+        inside it are counted as errors of that stage """
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, tags)
+
+
+class _Span:
+    __slots__ = ("sink", "name", "tags", "start")
+
+    def __init__(self, sink, name, tags):
+        self.sink = sink
+        self.name = name
+        self.tags = tags or {}
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.sink.timing(self.name, perf_counter() - self.start, self.tags)
+        if exc_type is not None and exc_type is not GeneratorExit:
+            self.sink.increment("errors", tags={**self.tags,
+                                                "stage": self.name})
+        return False
+
+
+def _tag_key(tags):
+    return tuple(sorted((tags or {}).items()))
+
+
+class MemorySink(MetricsSink):
+    """ keeps every timing and counter in memory, mostly for tests """
+    enabled = True
+
+    def __init__(self):
+        self._lock = Lock()
+        # (name, tags) -> [seconds, ...]
+        self.timings = defaultdict(list)
+        # (name, tags) -> count
+        self.counters = defaultdict(int)
+
+    def timing(self, name, seconds, tags=None):
+        with self._lock:
+            self.timings[(name, _tag_key(tags))].append(seconds)
+
+    def increment(self, name, value=1, tags=None):
+        with self._lock:
+            self.counters[(name, _tag_key(tags))] += value
+
+    def count(self, name, **tags):
+        """ sum of a counter over all tag values matching tags """
+        with self._lock:
+            return sum(v for (n, t), v in self.counters.items()
+                       if n == name and set(tags.items()) <= set(t))
+
+    def times(self, name, **tags):
+        """ all timings recorded for name matching tags """
+        with self._lock:
+            return [s for (n, t), values in self.timings.items()
+                    if n == name and set(tags.items()) <= set(t)
+                    for s in values]
+
+    def clear(self):
+        with self._lock:
+            self.timings.clear()
+            self.counters.clear()
+
+
+class PrometheusSink(MetricsSink):
+    """
+    aggregates timings and counters, render() returns them in the
+    prometheus text exposition format for a /metrics endpoint
+    """
+    enabled = True
+
+    def __init__(self, prefix="neon_solvers"):
+        self.prefix = prefix
+        self._lock = Lock()
+        # (name, tags) -> [count, sum]
+        self._summaries = defaultdict(lambda: [0, 0.0])
+        self._counters = defaultdict(int)
+
+    def timing(self, name, seconds, tags=None):
+        with self._lock:
+            summary = self._summaries[(name, _tag_key(tags))]
+            summary[0] += 1
+            summary[1] += seconds
+
+    def increment(self, name, value=1, tags=None):
+        with self._lock:
+            self._counters[(name, _tag_key(tags))] += value
+
+    @staticmethod
+    def _labels(tags):
+        if not tags:
+            return ""
+        labels = ",".join('{}="{}"'.format(
+            k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+            for k, v in tags)
+        return "{" + labels + "}"
+
+    def render(self):
+        with self._lock:
+            summaries = dict(self._summaries)
+            counters = dict(self._counters)
+        lines = []
+        for name in sorted({n for n, _ in summaries}):
+            metric = f"{self.prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for (n, tags), (count, total) in sorted(summaries.items()):
+                if n == name:
+                    labels = self._labels(tags)
+                    lines.append(f"{metric}_count{labels} {count}")
+                    lines.append(f"{metric}_sum{labels} {total}")
+        for name in sorted({n for n, _ in counters}):
+            metric = f"{self.prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (n, tags), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{metric}{self._labels(tags)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class StatsdSink(MetricsSink):
+    """
+    sends every timing and counter to a statsd server over udp, tags use
+    the dogstatsd "|#key:value" extension
+
+    send can replace the udp socket, it is called with each encoded line
+    """
+    enabled = True
+
+    def __init__(self, host="localhost", port=8125, prefix="neon_solvers",
+                 send=None):
+        self.prefix = prefix
+        self.address = (host, port)
+        self._send = send
+        self._socket = None
+        if send is None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def format(self, name, value, kind, tags=None):
+        line = f"{self.prefix}.{name}:{value}|{kind}"
+        if tags:
+            line += "|#" + ",".join(f"{k}:{v}" for k, v in tags.items())
+        return line
+
+    def send(self, line):
+        if self._send is not None:
+            self._send(line)
+            return
+        try:
+            self._socket.sendto(line.encode("utf-8"), self.address)
+        except OSError:
+            # metrics are best effort
+            pass
+
+    def timing(self, name, seconds, tags=None):
+        self.send(self.format(name, round(seconds * 1000, 3), "ms", tags))
+
+    def increment(self, name, value=1, tags=None):
+        self.send(self.format(name, value, "c", tags))
+
+
+NULL_SINK = MetricsSink()
+
+METRICS_SINKS = {
+    "memory": MemorySink,
+    "prometheus": PrometheusSink,
+    "statsd": StatsdSink
+}
+
+
+def create_metrics_sink(config=None):
+    """
+    create a metrics sink from a solver "metrics" config
+
+    config can be a sink name from METRICS_SINKS or a dict with a "sink"
+    name and its keyword arguments, eg. {"sink": "statsd", "port": 8125},
+    metrics are disabled if not set
+    """
+    if not config:
+        return NULL_SINK
+    if isinstance(config, str):
+        config = {"sink": config}
+    config = dict(config)
+    name = config.pop("sink")
+    if name not in METRICS_SINKS:
+        raise ValueError(f"unknown metrics sink: {name}")
+    return METRICS_SINKS[name](**config)
@@ -0,0 +1,151 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import re
+import unicodedata
+from threading import Lock
+
+# lang -> {contraction: expansion}
+CONTRACTIONS = {
+    "en": {
+        "what's": "what is", "who's": "who is", "where's": "where is",
+        "when's": "when is", "how's": "how is", "why's": "why is",
+        "it's": "it is", "that's": "that is", "there's": "there is",
+        "he's": "he is", "she's": "she is", "let's": "let us",
+        "i'm": "i am", "you're": "you are", "we're": "we are",
+        "they're": "they are", "i've": "i have", "you've": "you have",
+        "we've": "we have", "they've": "they have", "i'll": "i will",
+        "you'll": "you will", "isn't": "is not", "aren't": "are not",
+        "wasn't": "was not", "weren't": "were not", "don't": "do not",
+        "doesn't": "does not", "didn't": "did not", "can't": "cannot",
+        "won't": "will not", "shouldn't": "should not",
+        "couldn't": "could not", "wouldn't": "would not"
+    }
+}
+
+# lang -> words that do not change the meaning of a question
+STOPWORDS = {
+    "en": {"a", "an", "the", "please"}
+}
+
+# lang -> callable(query) -> query, replaces the default pipeline
+NORMALIZERS = {}
+
+_APOSTROPHES = re.compile(r"[‘’ʼ`´]")
+# punctuation that is part of a number, "2.5", "1,000", "3/4", "10:30"
+_NUMBER_SEPARATORS = ".,/:"
+# signs, "-5", "−5", "10%"
+_NUMBER_PREFIXES = "-−‐"
+_NUMBER_SUFFIXES = "%‰"
+
+
+def _is_numeric_punctuation(query, i):
+    """ True if query[i] belongs to a number and must not be stripped """
+    c = query[i]
+    before = i > 0 and query[i - 1].isdigit()
+    after = i + 1 < len(query) and query[i + 1].isdigit()
+    if c in _NUMBER_SEPARATORS:
+        return before and after
+    if c in _NUMBER_PREFIXES:
+        return after
+    if c in _NUMBER_SUFFIXES:
+        return before
+    return False
+
+
+def register_normalizer(lang, normalizer):
+    """ use normalizer(query) -> str instead of the default pipeline """
+    NORMALIZERS[lang.split("-")[0]] = normalizer
+
+
+class QueryNormalizer:
+    """
+    normalize queries before they are used as cache keys or sent to plugins
+
+    "What's  the speed of light?" -> "what is the speed of light"
+
+    steps are case folding, contraction expansion, punctuation and
+    whitespace stripping and optionally stop word removal, languages
+    can replace the whole pipeline with register_normalizer
+
+    punctuation belonging to numbers is kept, "what is -2.5%" keeps its
+    meaning for calculator style solvers
+    """
+
+    def __init__(self, lowercase=True, contractions=True, punctuation=True,
+                 stopwords=False):
+        self.lowercase = lowercase
+        self.contractions = contractions
+        self.punctuation = punctuation
+        self.stopwords = stopwords
+        self._lock = Lock()
+        self.lookups = 0
+        self.changed = 0
+        self.changed_hits = 0
+
+    @property
+    def stats(self):
+        """
+        changed - lookups where normalization modified the query
+        changed_hits - cache hits among those, an upper bound for the hits
+                       gained by normalizing
+        """
+        return {"lookups": self.lookups,
+                "changed": self.changed,
+                "changed_hits": self.changed_hits}
+
+    def record_lookup(self, changed, hit):
+        with self._lock:
+            self.lookups += 1
+            if changed:
+                self.changed += 1
+                if hit:
+                    self.changed_hits += 1
+
+    def normalize(self, query, lang="en"):
+        lang = lang.split("-")[0]
+        if lang in NORMALIZERS:
+            return NORMALIZERS[lang](query)
+        if self.lowercase:
+            query = query.casefold()
+        query = _APOSTROPHES.sub("'", query)
+        if self.punctuation:
+            # apostrophes are kept until contractions are expanded
+            query = "".join(" " if c != "'" and
+                            unicodedata.category(c).startswith("P") and
+                            not _is_numeric_punctuation(query, i)
+                            else c for i, c in enumerate(query))
+        words = query.split()
+        if self.contractions and lang in CONTRACTIONS:
+            table = CONTRACTIONS[lang]
+            words = [table.get(w.lower(), w) for w in words]
+        if self.punctuation:
+            words = [w.replace("'", "") for w in words]
+        if self.stopwords and lang in STOPWORDS:
+            words = [w for w in words if w.lower() not in STOPWORDS[lang]]
+        return " ".join(w for w in words if w)
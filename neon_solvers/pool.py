@@ -0,0 +1,88 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from threading import Lock
+
+
+class SharedPool:
+    """
+    process wide pool of objects shared between solver instances
+
+    acquire() returns the existing object for a key or creates it, each
+    acquire() must be matched by a release(), the object is closed once
+    the last user releases it
+    """
+
+    def __init__(self, close=None):
+        self._close = close
+        self._lock = Lock()
+        # key -> [object, reference count]
+        self._objects = {}
+
+    def acquire(self, key, factory):
+        with self._lock:
+            if key not in self._objects:
+                self._objects[key] = [factory(), 0]
+            self._objects[key][1] += 1
+            return self._objects[key][0]
+
+    def release(self, key):
+        with self._lock:
+            if key not in self._objects:
+                return
+            self._objects[key][1] -= 1
+            if self._objects[key][1] > 0:
+                return
+            obj, _ = self._objects.pop(key)
+        if self._close is not None:
+            self._close(obj)
+
+    def refcount(self, key):
+        with self._lock:
+            return self._objects[key][1] if key in self._objects else 0
+
+    def __contains__(self, key):
+        return key in self._objects
+
+    def __len__(self):
+        return len(self._objects)
+
+
+def _close_cache(cache):
+    # write behind caches drain pending changes
+    flush = getattr(cache, "flush", None) or cache.store
+    flush()
+    close = getattr(cache, "close", None)
+    if close is not None:
+        close()
+
+
+# one translator per translator config
+TRANSLATORS = SharedPool()
+# one cache handle per cache file
+CACHES = SharedPool(close=_close_cache)
@@ -0,0 +1,144 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import math
+from collections import Counter, defaultdict
+from threading import RLock
+
+
+class SimilarityIndex:
+    """
+    character n-gram tf-idf index for approximate query matching
+
+    search() returns the indexed key with the highest cosine similarity to
+    a query, only keys sharing an uncommon n-gram with the query are
+    scored thanks to an inverted index, so lookups do not scan the whole
+    cache
+
+    keys can be added and removed at any time, on_change can be registered
+    as a BoundedCache listener to follow writes and evictions
+    """
+
+    def __init__(self, n=3, keys=None):
+        self.n = n
+        self._lock = RLock()
+        # key -> {ngram: count}
+        self._grams = {}
+        # ngram -> set of keys containing it
+        self._postings = defaultdict(set)
+        for key in keys or []:
+            self.add(key)
+
+    def ngrams(self, text):
+        text = f" {' '.join(text.lower().split())} "
+        if len(text) <= self.n:
+            return Counter([text])
+        return Counter(text[i:i + self.n]
+                       for i in range(len(text) - self.n + 1))
+
+    def add(self, key):
+        with self._lock:
+            if key in self._grams:
+                return
+            grams = self._grams[key] = self.ngrams(key)
+            for gram in grams:
+                self._postings[gram].add(key)
+
+    def remove(self, key):
+        with self._lock:
+            grams = self._grams.pop(key, None)
+            for gram in grams or []:
+                keys = self._postings[gram]
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def clear(self):
+        with self._lock:
+            self._grams.clear()
+            self._postings.clear()
+
+    def on_change(self, key, present):
+        """ BoundedCache listener, key is None when the cache is cleared """
+        if key is None:
+            self.clear()
+        elif present:
+            self.add(key)
+        else:
+            self.remove(key)
+
+    def __contains__(self, key):
+        return key in self._grams
+
+    def __len__(self):
+        return len(self._grams)
+
+    def _idf(self, gram):
+        return math.log((1 + len(self._grams)) /
+                        (1 + len(self._postings.get(gram, ())))) + 1
+
+    def _norm(self, grams, idf):
+        return math.sqrt(sum((tf * idf(g)) ** 2 for g, tf in grams.items()))
+
+    def search(self, query, threshold=0.0, exclude=None):
+        """ return (key, score) of the most similar key scoring at least
+        threshold, (None, 0.0) if there is none """
+        grams = self.ngrams(query)
+        with self._lock:
+            idf_cache = {}
+
+            def idf(gram):
+                if gram not in idf_cache:
+                    idf_cache[gram] = self._idf(gram)
+                return idf_cache[gram]
+
+            # grams found in most keys ("wha", "is ") only add noise to the
+            # candidate set, rarer grams are enough to find close matches
+            max_df = max(len(self._grams) // 2, 1)
+            postings = [self._postings[g] for g in grams
+                        if g in self._postings]
+            rare = [keys for keys in postings if len(keys) <= max_df]
+            candidates = set().union(*(rare or postings))
+            candidates.discard(exclude)
+            if not candidates:
+                return None, 0.0
+            dots = {}
+            for key in candidates:
+                key_grams = self._grams[key]
+                dots[key] = sum(tf * key_grams[g] * idf(g) ** 2
+                                for g, tf in grams.items() if g in key_grams)
+            query_norm = self._norm(grams, idf)
+            best, best_score = None, 0.0
+            for key, dot in dots.items():
+                score = dot / (query_norm * self._norm(self._grams[key], idf))
+                if score > best_score:
+                    best, best_score = key, score
+        # float error can push identical strings slightly above 1
+        best_score = min(best_score, 1.0)
+        if best_score < threshold:
+            return None, 0.0
+        return best, best_score
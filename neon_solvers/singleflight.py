@@ -0,0 +1,103 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+from functools import partial
+from threading import Event, Lock
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    deduplicate concurrent calls sharing the same key
+
+    while a call for a key is in flight, identical calls wait for it and
+    share its result (or exception) instead of calling the backend again
+
+    do() and ado() return (result, leader), leader is True only for the
+    caller that actually ran the call, blocking and async callers are
+    tracked separately
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._flights = {}
+        self._async_flights = {}
+
+    def do(self, key, func, *args):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, False
+        try:
+            flight.result = func(*args)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.result, True
+
+    async def ado(self, key, afunc, *args):
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        task = self._async_flights.get(flight_key)
+        leader = task is None
+        if leader:
+            # the shared call runs as its own task, a caller giving up
+            # (eg. a request timeout) only cancels its own wait for it
+            task = self._async_flights[flight_key] = \
+                loop.create_task(afunc(*args))
+            task.add_done_callback(partial(self._async_done, flight_key))
+        return await asyncio.shield(task), leader
+
+    def _async_done(self, flight_key, task):
+        if self._async_flights.get(flight_key) is task:
+            self._async_flights.pop(flight_key)
+        # mark as retrieved, there might be no one left waiting
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self):
+        return len(self._flights) + len(self._async_flights)
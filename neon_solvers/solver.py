@@ -26,32 +26,278 @@
 # NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from json_database import JsonStorageXDG
-from ovos_plugin_manager.language import OVOSLangTranslationFactory
-from ovos_utils.xdg_utils import xdg_cache_home
-from quebra_frases import sentence_tokenize
+import asyncio
+import json
+from copy import copy
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+
+from ovos_utils.log import LOG
+
+from neon_solvers.cache import BoundedCache, MemoryCache, get_cache_backend
+from neon_solvers.compression import ZlibCodec
+from neon_solvers.metrics import create_metrics_sink
+from neon_solvers.normalize import QueryNormalizer
+from neon_solvers.pool import CACHES, TRANSLATORS
+from neon_solvers.similarity import SimilarityIndex
+from neon_solvers.singleflight import SingleFlight
+
+
+class _Call:
+    """
+    a blocking call yielded by an answer flow
+
+    the blocking api calls func directly, the async api awaits afunc if
+    given and otherwise runs func in the solver executor
+    """
+    __slots__ = ("func", "args", "afunc")
+
+    def __init__(self, func, *args, afunc=None):
+        self.func = func
+        self.args = args
+        self.afunc = afunc
+
+
+class RecentFailure(Exception):
+    """ the plugin failed to answer the same query moments ago, raised from
+    the negative cache instead of calling the plugin again """
+
+
+class _Failure:
+    """ negative cache entry of a failed plugin call """
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
 
 
 class AbstractSolver:
+    # persistent cache name -> cache file suffix
+    CACHE_SUFFIXES = {"data": "_data",
+                      "spoken": "",
+                      "steps": "_steps",
+                      "image": "_images",
+                      "record": "_records",
+                      "translation": "_translations"}
+    # get_data keys worth caching, others are dropped, None keeps all
+    cache_fields = None
+
     def __init__(self, name, priority=50, config=None):
         self.config = config or {}
         self.supported_langs = self.config.get("supported_langs") or []
         self.default_lang = self.config.get("lang", "en")
         if self.default_lang not in self.supported_langs:
             self.supported_langs.insert(0, self.default_lang)
+        self.name = name
         self.priority = priority
-        self.translator = OVOSLangTranslationFactory.create()
-        # cache contains raw data
-        self.cache = JsonStorageXDG(name + "_data",
-                                    xdg_folder=xdg_cache_home(),
-                                    subfolder="neon_solvers")
-        # spoken cache contains dialogs
-        self.spoken_cache = JsonStorageXDG(name,
-                                           xdg_folder=xdg_cache_home(),
-                                           subfolder="neon_solvers")
+        # translator and persistent caches are created on first use
+        self._translator = None
+        self._caches = {}
+        self._shared = {}
+        self._init_lock = Lock()
+        # memory cache contains final translated answers of hot queries,
+        # entries are only valid while still present in the persistent cache
+        self.memory_cache = BoundedCache(
+            MemoryCache(),
+            max_entries=self.config.get("memory_cache_max_entries", 256),
+            ttl=self.config.get("memory_cache_ttl"))
+        # queries are normalized before cache lookups, plugins get them as asked,
+        # set "normalization" to False to disable
+        normalization = self.config.get("normalization", {})
+        self.normalizer = QueryNormalizer(**normalization) \
+            if normalization is not False else None
+        # cache misses can be answered from the cached answer of the most
+        # similar previous query, disabled unless a threshold is set
+        self.fuzzy_threshold = self.config.get("fuzzy_match_threshold")
+        self._indexes = {}
+        self.fuzzy_hits = 0
+        # empty answers and failures are remembered for a short time, so
+        # repeated misses cost a lookup, "negative_cache_ttl" 0 disables it
+        negative_ttl = self.config.get("negative_cache_ttl", 60)
+        self.negative_cache = BoundedCache(
+            MemoryCache(),
+            max_entries=self.config.get("negative_cache_max_entries", 1024),
+            ttl=negative_ttl) if negative_ttl else None
+        if "cache_fields" in self.config:
+            self.cache_fields = self.config["cache_fields"]
+        # per stage timings and counters, disabled unless configured,
+        # can also be replaced with any MetricsSink
+        self.metrics = create_metrics_sink(self.config.get("metrics"))
+        self._metric_tags = {"solver": self.name}
+        # runs blocking plugin methods for the async api
+        self._executor = None
+        # concurrent cache misses for the same query share a backend call
+        self._flights = SingleFlight()
+
+    @property
+    def translator(self):
+        with self._init_lock:
+            if self._translator is None:
+                # translators are shared by all solvers with the same config
+                config = self.config.get("translator")
+                key = json.dumps(config, sort_keys=True)
+                self._translator = TRANSLATORS.acquire(
+                    key, partial(self._create_translator, config))
+                self._shared["translator"] = (TRANSLATORS, key)
+        return self._translator
+
+    @translator.setter
+    def translator(self, translator):
+        self._translator = translator
+
+    @staticmethod
+    def _create_translator(config=None):
+        from ovos_plugin_manager.language import OVOSLangTranslationFactory
+        return OVOSLangTranslationFactory.create(config)
+
+    def _get_cache(self, suffix):
+        with self._init_lock:
+            if suffix not in self._caches:
+                # "json" (default) rewrites the whole file on every store()
+                # "sqlite" reads and writes a single entry at a time
+                backend = self.config.get("cache_backend")
+                cache_folder = self.config.get("cache_folder")
+                # solver instances with the same name share cache handles,
+                # the limits of the first instance apply
+                key = (self.name + suffix, str(backend), cache_folder)
+                self._caches[suffix] = CACHES.acquire(
+                    key, partial(self._create_cache, self.name + suffix,
+                                 backend, cache_folder))
+                self._shared["cache" + suffix] = (CACHES, key)
+        return self._caches[suffix]
+
+    def _create_cache(self, name, backend, cache_folder):
+        # unbounded unless configured, ttl is given in seconds
+        # "cache_flush_interval" enables write behind, entries are saved by
+        # a background thread instead of on the request path
+        return BoundedCache(get_cache_backend(name, backend, cache_folder),
+                            max_entries=self.config.get("cache_max_entries"),
+                            max_bytes=self.config.get("cache_max_bytes"),
+                            ttl=self.config.get("cache_ttl"),
+                            flush_interval=self.config.get(
+                                "cache_flush_interval"),
+                            max_pending=self.config.get(
+                                "cache_flush_max_pending", 100),
+                            codec=ZlibCodec.from_config(
+                                self.config.get("cache_compression")))
+
+    def _release_shared(self):
+        """ release shared translator and cache handles and stop the
+        executor, the last solver using a cache flushes and closes it,
+        handles are acquired again if the solver is used afterwards """
+        # entries point at the released cache handles
+        self.memory_cache.clear()
+        with self._init_lock:
+            shared, self._shared = self._shared, {}
+            self._translator = None
+            caches, self._caches = self._caches, {}
+            executor, self._executor = self._executor, None
+            indexes, self._indexes = self._indexes, {}
+        for cache in caches.values():
+            # drain write behind caches still used by other solvers
+            if getattr(cache, "write_behind", False):
+                cache.flush()
+        for cache, index in indexes.values():
+            cache.remove_listener(index.on_change)
+        for pool, key in shared.values():
+            pool.release(key)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    @property
+    def cache(self):
+        """ cache contains raw data """
+        return self._get_cache("_data")
+
+    @cache.setter
+    def cache(self, cache):
+        self._caches["_data"] = cache
+
+    @property
+    def spoken_cache(self):
+        """ spoken cache contains dialogs """
+        return self._get_cache("")
+
+    @spoken_cache.setter
+    def spoken_cache(self, cache):
+        self._caches[""] = cache
+
+    @property
+    def steps_cache(self):
+        """ steps cache contains get_expanded_answer results """
+        return self._get_cache("_steps")
+
+    @steps_cache.setter
+    def steps_cache(self, cache):
+        self._caches["_steps"] = cache
+
+    @property
+    def image_cache(self):
+        """ image cache contains get_image results """
+        return self._get_cache("_images")
+
+    @image_cache.setter
+    def image_cache(self, cache):
+        self._caches["_images"] = cache
+
+    @property
+    def record_cache(self):
+        """ record cache contains get_record results """
+        return self._get_cache("_records")
+
+    @record_cache.setter
+    def record_cache(self, cache):
+        self._caches["_records"] = cache
+
+    @property
+    def uses_records(self):
+        """ True if the plugin answers with combined records """
+        return self._overrides("get_record") or \
+            self._overrides("aget_record")
+
+    @property
+    def translation_cache(self):
+        """ translation cache contains machine translations of queries and
+        answers, keyed by source lang, target lang and text """
+        return self._get_cache("_translations")
+
+    @translation_cache.setter
+    def translation_cache(self, cache):
+        self._caches["_translations"] = cache
+
+    def named_caches(self):
+        """ persistent caches by name, see CACHE_SUFFIXES """
+        return {name: self._get_cache(suffix)
+                for name, suffix in self.CACHE_SUFFIXES.items()}
+
+    @property
+    def cache_stats(self):
+        """ hit/miss/eviction counters for each cache """
+        return {"data": self.cache.stats,
+                "spoken": self.spoken_cache.stats,
+                "steps": self.steps_cache.stats,
+                "image": self.image_cache.stats,
+                "record": self.record_cache.stats,
+                "negative": self.negative_cache.stats
+                if self.negative_cache is not None else {},
+                "translation": self.translation_cache.stats,
+                "memory": self.memory_cache.stats,
+                "normalization": self.normalizer.stats
+                if self.normalizer else {},
+                "fuzzy": {"hits": self.fuzzy_hits}}
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.config.get("max_workers", 8),
+                thread_name_prefix=self.name)
+        return self._executor
 
     @staticmethod
     def sentence_split(text, max_sentences=25):
+        from quebra_frases import sentence_tokenize
         return sentence_tokenize(text)[:max_sentences]
 
     def _get_user_lang(self, context, lang=None):
@@ -60,6 +306,310 @@ class AbstractSolver:
         lang = lang.split("-")[0]
         return lang
 
+    def _normalize(self, query, lang):
+        if self.normalizer is None:
+            return query
+        return self.normalizer.normalize(query, lang)
+
+    def _span(self, stage):
+        """ time a stage with self.metrics """
+        return self.metrics.span(stage, self._metric_tags)
+
+    def _count(self, name):
+        if self.metrics.enabled:
+            self.metrics.increment(name, tags=self._metric_tags)
+
+    def _lookup(self, cache, query, context):
+        """ return (hit, answer) for query, the check and the read happen
+        under the cache lock so a concurrent eviction or expiry can not
+        remove the entry in between, counted in the cache and metrics """
+        with self._span("cache_lookup"), cache.lock:
+            hit = query in cache
+            answer = cache[query] if hit else None
+        self._count("cache_hits" if hit else "cache_misses")
+        if self.normalizer is not None:
+            self.normalizer.record_lookup(context.get("query_normalized"),
+                                          hit)
+        return hit, answer
+
+    def _memory_key(self, method, query, user_lang):
+        query = " ".join(self._normalize(query, user_lang).lower().split())
+        return f"{method}:{user_lang}:{query}"
+
+    def _memory_get(self, key):
+        """ return (True, answer) if key is in the memory cache and the
+        persistent cache entry it was computed from is still valid,
+        entries are [persistent cache, cache key, answer] """
+        with self.memory_cache.lock:
+            entry = self.memory_cache[key] if key in self.memory_cache \
+                else None
+        if entry is not None:
+            cache, cache_key, answer = entry
+            if cache.touch(cache_key):
+                return True, answer
+            self.memory_cache.pop(key, None)
+        return False, None
+
+    def _get_index(self, cache):
+        """ similarity index over the keys of cache, kept up to date with
+        writes and evictions by a cache listener """
+        with self._init_lock:
+            if id(cache) not in self._indexes:
+                index = SimilarityIndex(self.config.get("fuzzy_match_ngram",
+                                                        3))
+                with cache.lock:
+                    for key in cache.keys():
+                        index.add(key)
+                    cache.add_listener(index.on_change)
+                self._indexes[id(cache)] = (cache, index)
+            return self._indexes[id(cache)][1]
+
+    def _fuzzy_get(self, cache, query, context):
+        """
+        look for a cached answer to a query similar to query
+
+        returns (cache key, answer) and records the match in
+        context["fuzzy_match"], (None, None) if nothing is similar enough,
+        dict answers get a copy with the "match_score" added
+        """
+        if self.fuzzy_threshold is None:
+            return None, None
+        index = self._get_index(cache)
+        # entries can expire without being removed from the cache
+        for _ in range(3):
+            key, score = index.search(query, self.fuzzy_threshold,
+                                      exclude=query)
+            if key is None:
+                return None, None
+            if cache.touch(key):
+                break
+            index.remove(key)
+        else:
+            return None, None
+        answer = cache.get(key)
+        if answer is None:
+            return None, None
+        with self._init_lock:
+            self.fuzzy_hits += 1
+        context["fuzzy_match"] = {"query": key, "score": score}
+        if isinstance(answer, dict):
+            answer = dict(answer, match_score=score)
+        return key, answer
+
+    def _translate(self, text, target, source, store=True):
+        """ translate text, reusing previous translations if cached """
+        if not text or not isinstance(text, str):
+            return text
+        key = f"{source}:{target}:{text}"
+        if key in self.translation_cache:
+            return self.translation_cache[key]
+        self._count("translation_calls")
+        translated = self.translator.translate(text, target, source)
+        self.translation_cache[key] = translated
+        if store:
+            self.translation_cache.store()
+        return translated
+
+    def _translate_many(self, texts, target, source):
+        """
+        fill the translation cache for texts with as few round trips as
+        possible, translators implementing translate_list get a single call,
+        others are called concurrently in self.executor
+        """
+        missing = [t for t in dict.fromkeys(texts)
+                   if t and isinstance(t, str) and
+                   f"{source}:{target}:{t}" not in self.translation_cache]
+        if not missing:
+            return
+        if self._translates_lists():
+            self._count("translation_calls")
+            translated = self.translator.translate_list(list(missing),
+                                                        target, source)
+        else:
+            def translate(text):
+                self._count("translation_calls")
+                return self.translator.translate(text, target, source)
+
+            translated = list(self.executor.map(translate, missing))
+        self.translation_cache.update(
+            {f"{source}:{target}:{text}": tx
+             for text, tx in zip(missing, translated)})
+
+    def _translates_lists(self):
+        """ True if the translator has its own batch translate_list """
+        from ovos_plugin_manager.templates.language import LanguageTranslator
+        method = getattr(type(self.translator), "translate_list", None)
+        return method is not None and \
+            method is not LanguageTranslator.translate_list
+
+    @classmethod
+    def _strings(cls, value):
+        """ all strings in a (nested) answer """
+        if isinstance(value, str):
+            yield value
+        elif isinstance(value, dict):
+            for v in value.values():
+                yield from cls._strings(v)
+        elif isinstance(value, list):
+            for v in value:
+                yield from cls._strings(v)
+
+    def _translate_value(self, value, target, source):
+        if isinstance(value, dict):
+            return {k: self._translate_value(v, target, source)
+                    for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._translate_value(v, target, source) for v in value]
+        if isinstance(value, str):
+            return self._translate(value, target, source, store=False)
+        return value
+
+    def _translate_dict(self, data, target, source):
+        """ translate all strings in data, returns a new dict """
+        data = self._translate_value(data, target, source)
+        self.translation_cache.store()
+        return data
+
+    def _translate_list(self, data, target, source):
+        """ translate all strings in data, returns a new list """
+        data = self._translate_value(data, target, source)
+        self.translation_cache.store()
+        return data
+
+    @staticmethod
+    def _is_empty(answer):
+        return not answer or (isinstance(answer, dict) and
+                              not any(answer.values()))
+
+    def _known_miss(self, method, query):
+        """ return (True, empty answer) if query recently got an empty
+        answer, callers get their own copy of the answer, raises
+        RecentFailure if it recently failed so callers still see a failure """
+        key = f"{method}:{query}"
+        if self.negative_cache is not None and key in self.negative_cache:
+            answer = self.negative_cache.get(key)
+            if isinstance(answer, _Failure):
+                raise RecentFailure(f"{self.name} failed to answer {query}: "
+                                    f"{answer.error}")
+            return True, copy(answer)
+        return False, None
+
+    def _remember_miss(self, method, query, answer=None, error=None):
+        if self.negative_cache is None:
+            return
+        if error is not None:
+            answer = _Failure(repr(error))
+        self.negative_cache[f"{method}:{query}"] = answer
+
+    def _prune(self, method, answer):
+        """ drop get_data keys not listed in self.cache_fields """
+        if self.cache_fields is None or not isinstance(answer, dict):
+            return answer
+        if method == "record":
+            if isinstance(answer.get("data"), dict):
+                answer = dict(answer, data=self._prune("search",
+                                                       answer["data"]))
+            return answer
+        if method == "search":
+            return {k: v for k, v in answer.items() if k in self.cache_fields}
+        return answer
+
+    def _cache_answer(self, method, cache, query, answer):
+        if self._is_empty(answer):
+            # not persisted, retried once the negative cache entry expires
+            self._remember_miss(method, query, answer)
+        else:
+            cache[query] = answer
+
+    def _fetch(self, method, cache, func, query, context):
+        """ call the backend on a cache miss and cache the result, query is
+        the cache key, the backend gets the query before normalization """
+        if cache.touch(query):
+            # answered while waiting to become the flight leader
+            return cache[query]
+        self._count("backend_calls")
+        try:
+            with self._span("backend"):
+                answer = func(context.get("raw_query", query), context)
+        except Exception as e:
+            self._remember_miss(method, query, error=e)
+            raise
+        answer = self._prune(method, answer)
+        self._cache_answer(method, cache, query, answer)
+        return answer
+
+    async def _afetch(self, method, cache, afunc, query, context):
+        if cache.touch(query):
+            return cache[query]
+        self._count("backend_calls")
+        try:
+            with self._span("backend"):
+                answer = await afunc(context.get("raw_query", query),
+                                     context)
+        except Exception as e:
+            self._remember_miss(method, query, error=e)
+            raise
+        answer = self._prune(method, answer)
+        self._cache_answer(method, cache, query, answer)
+        return answer
+
+    def _fetch_call(self, method, cache, func, afunc, query, context):
+        """ _Call fetching a cache miss, shared by concurrent identical
+        queries, returns (answer, leader) """
+        key = f"{method}:{query}"
+        return _Call(partial(self._flights.do, key, self._fetch, method,
+                             cache, func),
+                     query, context,
+                     afunc=partial(self._flights.ado, key, self._afetch,
+                                   method, cache, afunc))
+
+    def _tx_query_flow(self, query, context=None, lang=None):
+        user_lang = self._get_user_lang(context, lang)
+        if user_lang in self.supported_langs:
+            # nothing to translate, no need to leave the event loop
+            return self._tx_query(query, context, lang)
+        return (yield _Call(self._tx_query, query, context, lang))
+
+    @staticmethod
+    def _run(flow):
+        """ run an answer flow, blocking """
+        result, error = None, None
+        while True:
+            try:
+                call = flow.throw(error) if error else flow.send(result)
+            except StopIteration as e:
+                return e.value
+            try:
+                result, error = call.func(*call.args), None
+            except Exception as e:
+                result, error = None, e
+
+    async def _arun(self, flow):
+        """ run an answer flow, offloading blocking calls to self.executor """
+        result, error = None, None
+        while True:
+            try:
+                call = flow.throw(error) if error else flow.send(result)
+            except StopIteration as e:
+                return e.value
+            try:
+                if call.afunc is not None:
+                    result = await call.afunc(*call.args)
+                else:
+                    result = await self._run_blocking(call.func, *call.args)
+                error = None
+            except Exception as e:
+                result, error = None, e
+
+    async def _run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args))
+
+    def _overrides(self, method):
+        """ check if a plugin implements method """
+        return method in vars(self) or \
+            getattr(type(self), method) is not getattr(AbstractSolver, method)
+
     def _tx_query(self, query, context=None, lang=None):
         context = context or {}
         lang = user_lang = self._get_user_lang(context, lang)
@@ -67,7 +617,17 @@ class AbstractSolver:
         # translate input to default lang
         if user_lang not in self.supported_langs:
             lang = self.default_lang
-            query = self.translator.translate(query, lang, user_lang)
+            # NeonSolversService shares translations between solvers
+            shared = context.get("query_translations")
+            key = f"{user_lang}:{lang}:{query}"
+            if shared is not None and key in shared:
+                query = shared[key]
+            else:
+                with self._span("tx_query"):
+                    translated = self._translate(query, lang, user_lang)
+                if shared is not None:
+                    shared[key] = translated
+                query = translated
 
         context["lang"] = lang
 
@@ -76,6 +636,14 @@ class AbstractSolver:
         # only common mistakes in default libretranslate plugin are handled
         query = query.replace("who is is ", "who is ")
 
+        # used as cache key, "What's X?" and "what is x" share an answer,
+        # plugins still receive the query as asked, see self._fetch
+        context["raw_query"] = query
+        if self.normalizer is not None:
+            normalized = self._normalize(query, lang)
+            context["query_normalized"] = normalized != query
+            query = normalized
+
         return query, context, lang
 
     # plugin methods to override
@@ -114,9 +682,53 @@ class AbstractSolver:
         """
         return []
 
+    def get_record(self, query, context=None):
+        """
+        optional, query assured to be in self.default_lang
+        return every answer to query from a single upstream call
+
+        {
+            "data": {"short_answer": "..."},
+            "spoken_answer": "single sentence text response",
+            "image": "optional/path/or/url",
+            "steps": [{"title": "", "summary": "", "img": ""}]
+        }
+
+        when implemented all user facing methods are answered from this
+        record, cached as a single entry, missing keys are answered by the
+        matching plugin method instead
+        """
+        return None
+
+    # async plugin methods, by default the blocking methods above are run in
+    # self.executor, async native plugins can override these instead
+    async def aget_spoken_answer(self, query, context):
+        return await self._run_blocking(self.get_spoken_answer, query, context)
+
+    async def aget_data(self, query, context):
+        if self._overrides("get_data") or \
+                not self._overrides("aget_spoken_answer"):
+            return await self._run_blocking(self.get_data, query, context)
+        return {"short_answer": await self.aget_spoken_answer(query, context)}
+
+    async def aget_record(self, query, context=None):
+        return await self._run_blocking(self.get_record, query, context)
+
+    async def aget_image(self, query, context=None):
+        return await self._run_blocking(self.get_image, query, context)
+
+    async def aget_expanded_answer(self, query, context=None):
+        return await self._run_blocking(self.get_expanded_answer, query,
+                                        context)
+
     def shutdown(self):
-        """ module specific shutdown method """
-        pass
+        """
+        module specific shutdown method
+
+        plugins overriding this should call super().shutdown() to release
+        shared translators and caches
+        """
+        self._release_shared()
 
     # user facing methods
     def search(self, query, context=None, lang=None):
@@ -124,60 +736,21 @@ class AbstractSolver:
         cache and auto translate query if needed
         returns translated response from self.get_data
         """
-        user_lang = self._get_user_lang(context, lang)
-        query, context, lang = self._tx_query(query, context, lang)
-        # read from cache
-        if query in self.cache:
-            data = self.cache[query]
-        else:
-            # search data
-            try:
-                data = self.get_data(query, context)
-            except:
-                return {}
-
-        # save to cache
-        self.cache[query] = data
-        self.cache.store()
-
-        # translate english output to user lang
-        if user_lang not in self.supported_langs:
-            return self.translator.translate_dict(data, user_lang, lang)
-        return data
+        return self._run(self._search(query, context, lang))
 
     def visual_answer(self, query, context=None, lang=None):
         """
         cache and auto translate query if needed
         returns image that answers query
         """
-        query, context, lang = self._tx_query(query, context, lang)
-        return self.get_image(query, context)
+        return self._run(self._visual_answer(query, context, lang))
 
     def spoken_answer(self, query, context=None, lang=None):
         """
         cache and auto translate query if needed
         returns chunked and translated response from self.get_spoken_answer
         """
-        user_lang = self._get_user_lang(context, lang)
-        query, context, lang = self._tx_query(query, context, lang)
-
-        # get answer
-        if query in self.spoken_cache:
-            # read from cache
-            summary = self.spoken_cache[query]
-        else:
-            summary = self.get_spoken_answer(query, context)
-            # save to cache
-            self.spoken_cache[query] = summary
-            self.spoken_cache.store()
-
-        # summarize
-        if summary:
-            # translate english output to user lang
-            if user_lang not in self.supported_langs:
-                return self.translator.translate(summary, user_lang, lang)
-            else:
-                return summary
+        return self._run(self._spoken_answer(query, context, lang))
 
     def long_answer(self, query, context=None, lang=None):
         """
@@ -190,19 +763,350 @@ class AbstractSolver:
         }
         :return:
         """
+        return self._run(self._long_answer(query, context, lang))
+
+    # streaming user facing methods
+    def spoken_answers(self, query, context=None, lang=None):
+        """
+        cache and auto translate query if needed
+        yields the sentences of self.get_spoken_answer one at a time,
+        each sentence is only translated when requested
+        """
         user_lang = self._get_user_lang(context, lang)
-        query, context, lang = self._tx_query(query, context, lang)
-        steps = self.get_expanded_answer(query, context)
+        mem_key = self._memory_key("spoken_answers", query, user_lang)
+        cached, sentences = self._memory_get(mem_key)
+        if cached:
+            yield from sentences
+            return
+        cache, query, lang, summary = self._run(
+            self._spoken_summary(query, context, lang))
+        sentences = []
+        for sentence in self.sentence_split(summary, None) if summary else []:
+            if user_lang not in self.supported_langs:
+                with self._span("tx_answer"):
+                    sentence = self._translate(sentence, user_lang, lang,
+                                               store=False)
+            sentences.append(sentence)
+            yield sentence
+        if user_lang not in self.supported_langs:
+            self.translation_cache.store()
+        self.memory_cache[mem_key] = [cache, query, sentences]
 
-        # use spoken_answer as last resort
-        if not steps:
-            summary = self.get_spoken_answer(query, context)
-            if summary:
-                img = self.get_image(query, context)
-                steps = [{"title": query, "summary": step0, "img": img}
-                         for step0 in self.sentence_split(summary, -1)]
+    def long_answers(self, query, context=None, lang=None):
+        """
+        yields the steps of self.long_answer one at a time,
+        each step is only translated when requested
+        """
+        user_lang = self._get_user_lang(context, lang)
+        _, _, lang, steps = self._run(self._long_steps(query, context, lang))
+        for step in steps:
+            if user_lang not in self.supported_langs:
+                with self._span("tx_answer"):
+                    step = self._translate_value(step, user_lang, lang)
+            yield step
+        if user_lang not in self.supported_langs:
+            self.translation_cache.store()
+
+    # async user facing methods
+    async def asearch(self, query, context=None, lang=None):
+        """ async version of self.search """
+        return await self._arun(self._search(query, context, lang))
+
+    async def avisual_answer(self, query, context=None, lang=None):
+        """ async version of self.visual_answer """
+        return await self._arun(self._visual_answer(query, context, lang))
+
+    async def aspoken_answer(self, query, context=None, lang=None):
+        """ async version of self.spoken_answer """
+        return await self._arun(self._spoken_answer(query, context, lang))
+
+    async def along_answer(self, query, context=None, lang=None):
+        """ async version of self.long_answer """
+        return await self._arun(self._long_answer(query, context, lang))
+
+    # batch user facing methods
+    def search_batch(self, queries, context=None, lang=None):
+        """
+        self.search for many queries at once, returns answers in input order
+        """
+
+        def finish(data, user_lang, lang):
+            if user_lang not in self.supported_langs:
+                return self._translate_value(data, user_lang, lang)
+            return data
+
+        return self._batch("search", "data", self.cache, self.get_data,
+                           finish, queries, context, lang, default={})
+
+    def spoken_answer_batch(self, queries, context=None, lang=None):
+        """
+        self.spoken_answer for many queries at once, returns answers in
+        input order
+        """
+
+        def finish(summary, user_lang, lang):
+            if not summary:
+                return None
+            if user_lang not in self.supported_langs:
+                return self._translate(summary, user_lang, lang, store=False)
+            return summary
+
+        return self._batch("spoken_answer", "spoken_answer",
+                           self.spoken_cache, self.get_spoken_answer, finish,
+                           queries, context, lang)
+
+    def _batch(self, method, field, cache, func, finish, queries,
+               context=None, lang=None, default=None):
+        """
+        answer unique queries from memory and cache first, translate the
+        remaining ones and the answers in batches (see _translate_many),
+        fetch misses in self.executor and flush all caches once at the end
+
+        finish(answer, user_lang, lang) turns a cached answer into the
+        user facing one, default is returned for failed queries, field is
+        the part of a combined record answering method
+        """
+        context = context or {}
+        user_lang = self._get_user_lang(context, lang)
+        needs_tx = user_lang not in self.supported_langs
+        records = self.uses_records
+        flight = method
+        if records:
+            cache, func = self.record_cache, self.get_record
+            flight = "record"
+        answers = {}
+        pending = []
+        for query in dict.fromkeys(queries):
+            mem_key = self._memory_key(method, query, user_lang)
+            cached, answer = self._memory_get(mem_key)
+            if cached:
+                answers[query] = answer
+            else:
+                pending.append(query)
+        if not pending:
+            return [answers[q] for q in queries]
+
+        if needs_tx:
+            # fills the translation cache, _tx_query below only reads it
+            with self._span("tx_query"):
+                self._translate_many(pending, self.default_lang, user_lang)
+        translated = {}
+        for query in pending:
+            translated[query] = self._tx_query(query, dict(context), lang)
+
+        results = {}
+        misses = []
+        for query, (tx_query, tx_context, tx_lang) in translated.items():
+            hit, answer = self._lookup(cache, tx_query, tx_context)
+            if hit:
+                results[query] = answer
+                continue
+            match, answer = self._fuzzy_get(cache, tx_query, tx_context)
+            if match is not None:
+                results[query] = answer
+                translated[query] = (match, tx_context, tx_lang)
+                continue
+            try:
+                missed, answer = self._known_miss(flight, tx_query)
+            except RecentFailure:
+                missed, answer = True, default
+            if missed:
+                results[query] = answer
+            else:
+                misses.append(query)
+
+        def fetch(query):
+            tx_query, tx_context, _ = translated[query]
+            try:
+                return self._flights.do(f"{flight}:{tx_query}", self._fetch,
+                                        flight, cache, func, tx_query,
+                                        tx_context)[0]
+            except Exception as e:
+                LOG.error(f"{self.name} failed to answer {tx_query}: {e}")
+                return default
+
+        results.update(zip(misses, self.executor.map(fetch, misses)))
+        if misses:
+            with self._span("store"):
+                cache.store()
+
+        if needs_tx:
+            # fills the translation cache, finish() below only reads it
+            texts = []
+            for query in pending:
+                answer = results[query]
+                if records and isinstance(answer, dict):
+                    answer = answer.get(field)
+                if answer is not default:
+                    texts.extend(self._strings(answer))
+            with self._span("tx_answer"):
+                self._translate_many(texts, user_lang, self.default_lang)
+
+        for query in pending:
+            tx_query, _, tx_lang = translated[query]
+            answer = results[query]
+            if answer is default:
+                # failed, not cached
+                answers[query] = answer
+                continue
+            if records:
+                if not isinstance(answer, dict) or field not in answer:
+                    # not part of the record, answer it on its own
+                    answers[query] = self._run(self._search(
+                        query, dict(context), lang)
+                        if field == "data" else self._spoken_answer(
+                        query, dict(context), lang))
+                    continue
+                answer = answer[field]
+            with self._span("tx_answer"):
+                answer = finish(answer, user_lang, tx_lang)
+            answers[query] = answer
+            self.memory_cache[self._memory_key(method, query, user_lang)] = \
+                [cache, tx_query, answer]
+        if needs_tx:
+            self.translation_cache.store()
+        return [answers[q] for q in queries]
+
+    # answer flows, shared by the blocking and async user facing methods
+    # slow calls are yielded as _Call objects and run by _run / _arun
+    def _cached(self, method, cache, func, afunc, query, context):
+        """
+        returns (cache key, answer) from cache, the cached answer of a
+        similar query or the backend, backend answers are cached
+        """
+        hit, answer = self._lookup(cache, query, context)
+        if hit:
+            return query, answer
+        match, answer = self._fuzzy_get(cache, query, context)
+        if match is not None:
+            # memory cache entries stay valid while the match is cached
+            return match, answer
+        missed, answer = self._known_miss(method, query)
+        if missed:
+            return query, answer
+        answer, leader = yield self._fetch_call(method, cache, func, afunc,
+                                                query, context)
+        # hits are not rewritten so the ttl is respected
+        if leader and not self._is_empty(answer):
+            with self._span("store"):
+                yield _Call(cache.store)
+        return query, answer
+
+    def _view(self, field, method, cache, func, afunc, query, context):
+        """
+        returns (cache, cache key, answer) for field of the combined record
+        if the plugin implements get_record and the record contains field,
+        otherwise from cache and func
+        """
+        if self.uses_records:
+            key, record = yield from self._cached(
+                "record", self.record_cache, self.get_record,
+                self.aget_record, query, context)
+            if isinstance(record, dict) and field in record:
+                return self.record_cache, key, record[field]
+        key, answer = yield from self._cached(method, cache, func, afunc,
+                                              query, context)
+        return cache, key, answer
+
+    def _search(self, query, context=None, lang=None):
+        user_lang = self._get_user_lang(context, lang)
+        mem_key = self._memory_key("search", query, user_lang)
+        cached, answer = self._memory_get(mem_key)
+        if cached:
+            return answer
+        query, context, lang = yield from self._tx_query_flow(query, context,
+                                                              lang)
+        # search data
+        try:
+            cache, query, data = yield from self._view(
+                "data", "search", self.cache, self.get_data, self.aget_data,
+                query, context)
+        except:
+            return {}
 
         # translate english output to user lang
         if user_lang not in self.supported_langs:
-            return self.translator.translate_list(steps, user_lang, lang)
+            with self._span("tx_answer"):
+                data = yield _Call(self._translate_dict, data, user_lang,
+                                   lang)
+        self.memory_cache[mem_key] = [cache, query, data]
+        return data
+
+    def _visual_answer(self, query, context=None, lang=None):
+        query, context, lang = yield from self._tx_query_flow(query, context,
+                                                              lang)
+        _, _, image = yield from self._view(
+            "image", "visual_answer", self.image_cache, self.get_image,
+            self.aget_image, query, context)
+        return image
+
+    def _spoken_answer(self, query, context=None, lang=None):
+        user_lang = self._get_user_lang(context, lang)
+        mem_key = self._memory_key("spoken_answer", query, user_lang)
+        cached, answer = self._memory_get(mem_key)
+        if cached:
+            return answer
+        cache, query, lang, summary = yield from self._spoken_summary(
+            query, context, lang)
+
+        # summarize
+        answer = None
+        if summary:
+            # translate english output to user lang
+            if user_lang not in self.supported_langs:
+                with self._span("tx_answer"):
+                    answer = yield _Call(self._translate, summary, user_lang,
+                                         lang)
+            else:
+                answer = summary
+        self.memory_cache[mem_key] = [cache, query, answer]
+        return answer
+
+    def _spoken_summary(self, query, context=None, lang=None):
+        """ returns (cache, cache key, lang, untranslated summary) """
+        query, context, lang = yield from self._tx_query_flow(query, context,
+                                                              lang)
+        cache, query, summary = yield from self._view(
+            "spoken_answer", "spoken_answer", self.spoken_cache,
+            self.get_spoken_answer, self.aget_spoken_answer, query, context)
+        return cache, query, lang, summary
+
+    def _long_answer(self, query, context=None, lang=None):
+        user_lang = self._get_user_lang(context, lang)
+        mem_key = self._memory_key("long_answer", query, user_lang)
+        cached, steps = self._memory_get(mem_key)
+        if cached:
+            return steps
+        cache, query, lang, steps = yield from self._long_steps(query,
+                                                                context, lang)
+
+        # translate english output to user lang
+        if user_lang not in self.supported_langs:
+            with self._span("tx_answer"):
+                steps = yield _Call(self._translate_list, steps, user_lang,
+                                    lang)
+        self.memory_cache[mem_key] = [cache, query, steps]
         return steps
+
+    def _long_steps(self, query, context=None, lang=None):
+        """ returns (cache, cache key, lang, untranslated steps) """
+        query, context, lang = yield from self._tx_query_flow(query, context,
+                                                              lang)
+        cache, key, steps = yield from self._view(
+            "steps", "long_answer", self.steps_cache,
+            self.get_expanded_answer, self.aget_expanded_answer, query,
+            context)
+
+        # use spoken_answer as last resort, reusing cached answers
+        if not steps:
+            _, _, summary = yield from self._view(
+                "spoken_answer", "spoken_answer", self.spoken_cache,
+                self.get_spoken_answer, self.aget_spoken_answer, query,
+                context)
+            if summary:
+                _, _, img = yield from self._view(
+                    "image", "visual_answer", self.image_cache,
+                    self.get_image, self.aget_image, query, context)
+                steps = [{"title": query, "summary": step0, "img": img}
+                         for step0 in self.sentence_split(summary, None)]
+        return cache, key, lang, steps
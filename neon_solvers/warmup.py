@@ -0,0 +1,236 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+pre-warm solver caches and move cache contents between nodes
+
+    python -m neon_solvers.warmup prewarm my-solver-plugin questions.txt
+    python -m neon_solvers.warmup export my-solver-plugin cache.jsonl.gz
+    python -m neon_solvers.warmup import my-solver-plugin cache.jsonl.gz
+
+exports are json lines, gzip compressed if the file name ends in .gz, the
+first line is a header with the format version followed by one line per
+cache entry
+"""
+import argparse
+import gzip
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import monotonic, sleep, time
+
+from ovos_utils.log import LOG
+
+EXPORT_FORMAT = "neon_solvers.cache"
+EXPORT_VERSION = 1
+
+
+class RateLimiter:
+    """ spaces calls to wait() so at most rate happen per second """
+
+    def __init__(self, rate=None):
+        self.interval = 1 / rate if rate else 0
+        self._next = 0
+        self._lock = Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            sleep(start - now)
+
+
+def prewarm(solver, queries, methods=("search", "spoken_answer"),
+            lang=None, concurrency=4, rate_limit=None):
+    """
+    answer queries with solver so their answers are cached
+
+    queries are sent by concurrency threads, at most rate_limit per second
+    if set, returns counts of answered, empty and failed calls
+    """
+    limiter = RateLimiter(rate_limit)
+    stats = {"answered": 0, "empty": 0, "failed": 0}
+    lock = Lock()
+
+    def warm(job):
+        method, query = job
+        limiter.wait()
+        try:
+            answer = getattr(solver, method)(query, {"lang": lang}
+                                             if lang else None)
+            result = "answered" if answer else "empty"
+        except Exception as e:
+            LOG.error(f"failed to pre-warm {method} {query}: {e}")
+            result = "failed"
+        with lock:
+            stats[result] += 1
+
+    start = monotonic()
+    jobs = [(m, q) for q in dict.fromkeys(queries) for m in methods]
+    with ThreadPoolExecutor(max(concurrency, 1)) as pool:
+        list(pool.map(warm, jobs))
+    stats["seconds"] = monotonic() - start
+    return stats
+
+
+def _open(path, mode):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def export_cache(solver, path, caches=None):
+    """
+    write the valid entries of the solver caches to path
+
+    caches is a list of names from AbstractSolver.CACHE_SUFFIXES, all by
+    default, returns the number of exported entries per cache
+    """
+    named = solver.named_caches()
+    counts = {}
+    with _open(path, "w") as f:
+        f.write(json.dumps({"format": EXPORT_FORMAT,
+                            "version": EXPORT_VERSION,
+                            "solver": solver.name,
+                            "created": time()}) + "\n")
+        for name in caches or named:
+            cache = named[name]
+            counts[name] = 0
+            for key in cache.keys():
+                value = cache.get(key)
+                if value is None:
+                    # expired or evicted meanwhile
+                    continue
+                f.write(json.dumps({"cache": name, "key": key,
+                                    "value": value},
+                                   ensure_ascii=False) + "\n")
+                counts[name] += 1
+    return counts
+
+
+def import_cache(solver, path, overwrite=False, batch_size=1000):
+    """
+    load entries exported by export_cache into the solver caches
+
+    entries are bulk inserted batch_size at a time and each cache is only
+    stored once, existing entries are kept unless overwrite is True,
+    returns the number of imported entries per cache
+    """
+    named = solver.named_caches()
+    counts = {name: 0 for name in named}
+    batches = {name: {} for name in named}
+
+    def insert(name):
+        cache = named[name]
+        entries = batches[name]
+        if not overwrite:
+            entries = {k: v for k, v in entries.items() if not cache.touch(k)}
+        if entries:
+            cache.update(entries)
+        counts[name] += len(entries)
+        batches[name] = {}
+
+    with _open(path, "r") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != EXPORT_FORMAT:
+            raise ValueError(f"{path} is not a neon_solvers cache export")
+        if header.get("version", 0) > EXPORT_VERSION:
+            raise ValueError(f"unsupported cache export version: "
+                             f"{header['version']}")
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            name = entry["cache"]
+            if name not in batches:
+                LOG.warning(f"skipping entry of unknown cache: {name}")
+                continue
+            batches[name][entry["key"]] = entry["value"]
+            if len(batches[name]) >= batch_size:
+                insert(name)
+    for name in named:
+        insert(name)
+        named[name].store()
+    return counts
+
+
+def _load_solver(plugin):
+    from ovos_plugin_manager.solvers import load_question_solver_plugin
+    plug = load_question_solver_plugin(plugin)
+    if plug is None:
+        raise ImportError(f"{plugin} is not installed")
+    return plug()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="pre-warm, export and import neon_solvers caches")
+    commands = parser.add_subparsers(dest="command", required=True)
+    warm = commands.add_parser("prewarm", help="cache answers to questions")
+    warm.add_argument("plugin")
+    warm.add_argument("questions", help="text file, one question per line")
+    warm.add_argument("--methods", nargs="+",
+                      default=["search", "spoken_answer"])
+    warm.add_argument("--lang")
+    warm.add_argument("--concurrency", type=int, default=4)
+    warm.add_argument("--rate-limit", type=float,
+                      help="max questions per second")
+    export = commands.add_parser("export", help="export cache contents")
+    export.add_argument("plugin")
+    export.add_argument("path")
+    export.add_argument("--caches", nargs="+")
+    imp = commands.add_parser("import", help="import exported caches")
+    imp.add_argument("plugin")
+    imp.add_argument("path")
+    imp.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args(args)
+
+    solver = _load_solver(args.plugin)
+    try:
+        if args.command == "prewarm":
+            with open(args.questions, encoding="utf-8") as f:
+                questions = [q.strip() for q in f if q.strip()]
+            result = prewarm(solver, questions, args.methods, args.lang,
+                             args.concurrency, args.rate_limit)
+        elif args.command == "export":
+            result = export_cache(solver, args.path, args.caches)
+        else:
+            result = import_cache(solver, args.path, args.overwrite)
+    finally:
+        solver.shutdown()
+    json.dump(result, sys.stdout)
+    print()
+    return result
+
+
+if __name__ == "__main__":
+    main()
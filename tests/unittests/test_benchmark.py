@@ -0,0 +1,91 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import json
+import unittest
+from os.path import join
+from tempfile import mkdtemp
+
+from neon_solvers.benchmark import main, percentile, run_scenario
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 95), 3)
+        self.assertIsNone(percentile([], 50))
+
+    def test_scenario(self):
+        cold = run_scenario("spoken_answer", cache_size=10, requests=5,
+                            translated=True, latency=0, tx_latency=0)
+        self.assertEqual(cold["cache"], "cold")
+        self.assertEqual(cold["requests"], 5)
+        self.assertGreater(cold["translator_calls"], 0)
+        self.assertLessEqual(cold["p50"], cold["p99"])
+
+        warm = run_scenario("service", cache_size=10, requests=5, warm=True,
+                            translated=True, concurrency=2, latency=0,
+                            tx_latency=0)
+        self.assertEqual(warm["dispatch"], "concurrent")
+        # translations were cached by the warm up pass
+        self.assertEqual(warm["translator_calls"], 0)
+
+        parallel = run_scenario("service", cache_size=10, requests=5,
+                                parallel=True, latency=0, tx_latency=0)
+        self.assertTrue(parallel["parallel"])
+        self.assertEqual(parallel["requests"], 5)
+
+    def test_cli(self):
+        output = join(mkdtemp(), "bench.json")
+        main(["--methods", "search", "--sizes", "10", "--requests", "3",
+              "--latency", "0", "--tx-latency", "0",
+              "--footprint-sizes", "20", "--output", output])
+        with open(output) as f:
+            report = json.load(f)
+        # cold/warm x translated/untranslated x sequential/concurrent
+        self.assertEqual(len(report["results"]), 8)
+        self.assertEqual(report["settings"]["requests"], 3)
+        for result in report["results"]:
+            for key in ("throughput", "p50", "p95", "p99"):
+                self.assertIsNotNone(result[key])
+        footprint = {r["variant"]: r for r in report["footprint"]}
+        self.assertEqual(set(footprint), {"plain", "compressed",
+                                          "compressed_dictionary", "fields"})
+        self.assertLess(footprint["compressed"]["stored_bytes"],
+                        footprint["plain"]["stored_bytes"])
+        self.assertLess(footprint["fields"]["stored_bytes"],
+                        footprint["plain"]["stored_bytes"])
+
+        # the service is also run with parallel dispatch
+        report = main(["--methods", "service", "--sizes", "10",
+                       "--requests", "2", "--latency", "0",
+                       "--tx-latency", "0", "--footprint-sizes", "20",
+                       "--output", output])
+        self.assertEqual(len(report["results"]), 16)
+        self.assertEqual(sum(r["parallel"] for r in report["results"]), 8)
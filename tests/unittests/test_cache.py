@@ -0,0 +1,292 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+from tempfile import mkdtemp
+from time import sleep
+
+from json_database import JsonStorageXDG
+
+from neon_solvers.cache import BoundedCache, MemoryCache, SQLiteCache, \
+    get_cache_backend, require_shared_backends
+
+
+class TestSQLiteCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+
+    def test_set_get(self):
+        cache = SQLiteCache("test", xdg_folder=self.folder)
+        self.assertNotIn("q", cache)
+        self.assertIsNone(cache.get("q"))
+        with self.assertRaises(KeyError):
+            cache["q"]
+        cache["q"] = {"short_answer": "42"}
+        self.assertIn("q", cache)
+        self.assertEqual(cache["q"], {"short_answer": "42"})
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.keys(), ["q"])
+
+        del cache["q"]
+        self.assertNotIn("q", cache)
+        self.assertEqual(cache.pop("q", "default"), "default")
+
+    def test_persistence(self):
+        cache = SQLiteCache("test", xdg_folder=self.folder)
+        cache.update({"a": "1", "b": "2"})
+        cache.store()
+        cache.close()
+
+        cache = SQLiteCache("test", xdg_folder=self.folder)
+        self.assertEqual(dict(cache.items()), {"a": "1", "b": "2"})
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_get_cache_backend(self):
+        self.assertIsInstance(get_cache_backend("t", "json", self.folder),
+                              JsonStorageXDG)
+        self.assertIsInstance(get_cache_backend("t", "sqlite", self.folder),
+                              SQLiteCache)
+        custom = get_cache_backend("t", lambda name, folder: {"name": name})
+        self.assertEqual(custom, {"name": "t"})
+        with self.assertRaises(ValueError):
+            get_cache_backend("t", "unknown")
+
+    def test_require_shared_backends(self):
+        require_shared_backends()
+        try:
+            # several processes would rewrite the same json file
+            self.assertIsInstance(get_cache_backend("t", "json",
+                                                    self.folder),
+                                  SQLiteCache)
+            self.assertIsInstance(get_cache_backend("t", "memory"),
+                                  MemoryCache)
+        finally:
+            require_shared_backends(False)
+
+
+class TestBoundedCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = BoundedCache(FakeBackend(), max_entries=2)
+        cache["a"] = 1
+        cache["b"] = 2
+        # touch "a" so "b" is the least recently used
+        self.assertEqual(cache["a"], 1)
+        cache["c"] = 3
+        self.assertEqual(sorted(cache.keys()), ["a", "c"])
+        self.assertNotIn("b", cache.backend)
+        self.assertEqual(cache.stats["evictions"], 1)
+
+    def test_max_bytes(self):
+        cache = BoundedCache(FakeBackend(), max_bytes=20)
+        cache["a"] = "x" * 10
+        cache["b"] = "y" * 10
+        self.assertEqual(cache.keys(), ["b"])
+        self.assertLessEqual(cache.stats["bytes"], 20)
+
+    def test_ttl(self):
+        cache = BoundedCache(FakeBackend(), ttl=60)
+        cache["a"] = 1
+        self.assertIn("a", cache)
+        cache._meta["a"][0] -= 61
+        self.assertNotIn("a", cache)
+        self.assertNotIn("a", cache.backend)
+        self.assertEqual(cache.stats["expirations"], 1)
+
+    def test_stats(self):
+        cache = BoundedCache(FakeBackend())
+        self.assertNotIn("a", cache)
+        cache["a"] = 1
+        self.assertIn("a", cache)
+        self.assertEqual(cache.stats["hits"], 1)
+        self.assertEqual(cache.stats["misses"], 1)
+        self.assertEqual(cache.stats["entries"], 1)
+
+    def test_existing_entries(self):
+        backend = SQLiteCache("test", xdg_folder=mkdtemp())
+        backend.update({"a": 1, "b": 2, "c": 3})
+        cache = BoundedCache(backend, max_entries=2)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(len(backend), 2)
+        cache.store()
+
+    def test_unbounded(self):
+        backend = FakeBackend({"a": 1})
+        cache = BoundedCache(backend)
+        # nothing tracked in memory without limits
+        self.assertIsNone(cache._meta)
+        self.assertIn("a", cache)
+        cache["b"] = 2
+        self.assertEqual(backend, {"a": 1, "b": 2})
+        self.assertEqual(sorted(cache.keys()), ["a", "b"])
+        self.assertEqual(cache.pop("a"), 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_sqlite_lru(self):
+        folder = mkdtemp()
+        cache = BoundedCache(SQLiteCache("test", xdg_folder=folder),
+                             max_entries=2)
+        # access times are kept in the table, not in memory
+        self.assertIsNone(cache._meta)
+        cache["a"] = 1
+        cache["b"] = 2
+        sleep(0.01)
+        atime = "SELECT atime FROM cache WHERE key = 'a'"
+        before = cache.backend._execute(atime)
+        self.assertTrue(cache.touch("a"))
+        self.assertEqual(cache["a"], 1)
+        # reads never write, access times are stored before evicting
+        self.assertEqual(cache.backend._execute(atime), before)
+        cache["c"] = 3
+        self.assertEqual(sorted(cache.keys()), ["a", "c"])
+        self.assertEqual(cache.stats["evictions"], 1)
+        cache.close()
+
+        cache = BoundedCache(SQLiteCache("test", xdg_folder=folder),
+                             max_bytes=20)
+        self.assertLessEqual(cache.stats["bytes"], 20)
+        self.assertEqual(cache.stats["entries"], 2)
+        cache["d"] = "x" * 17
+        self.assertEqual(cache.keys(), ["d"])
+        cache.close()
+
+    def test_sqlite_ttl_after_restart(self):
+        folder = mkdtemp()
+        backend = SQLiteCache("test", xdg_folder=folder)
+        backend["a"] = 1
+        backend._execute("UPDATE cache SET ts = ts - 61")
+        backend.close()
+        cache = BoundedCache(SQLiteCache("test", xdg_folder=folder), ttl=60)
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.stats["expirations"], 1)
+        cache.close()
+
+    def test_json_ttl_after_restart(self):
+        folder = mkdtemp()
+        cache = BoundedCache(get_cache_backend("test", "json", folder),
+                             ttl=60)
+        cache["a"] = 1
+        cache["b"] = 2
+        # write times are stored with the entries
+        cache.backend["a"]["~ts"] -= 61
+        cache.store()
+
+        cache = BoundedCache(get_cache_backend("test", "json", folder),
+                             ttl=60)
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache["b"], 2)
+        self.assertEqual(dict(cache.items()), {"b": 2})
+
+    def test_shared_backend(self):
+        # two processes using the same sqlite file
+        folder = mkdtemp()
+        first = BoundedCache(SQLiteCache("test", xdg_folder=folder))
+        second = BoundedCache(SQLiteCache("test", xdg_folder=folder))
+
+        first["a"] = 1
+        self.assertTrue(second.touch("a"))
+        self.assertIn("a", second)
+        self.assertEqual(second["a"], 1)
+
+        second["a"] = 2
+        self.assertEqual(first["a"], 2)
+
+        del first["a"]
+        self.assertNotIn("a", second)
+        self.assertEqual(len(second), 0)
+
+    def test_listeners(self):
+        cache = BoundedCache(FakeBackend(), max_entries=1)
+        events = []
+        cache.add_listener(lambda key, present: events.append((key, present)))
+        cache["a"] = 1
+        cache["b"] = 2
+        cache.clear()
+        self.assertEqual(events, [("a", True), ("b", True), ("a", False),
+                                  (None, False)])
+
+
+class TestWriteBehind(unittest.TestCase):
+    def test_pending_changes(self):
+        backend = FakeBackend()
+        cache = BoundedCache(backend, flush_interval=60, max_pending=None)
+        cache["a"] = 1
+        cache["b"] = 2
+        cache.store()
+        # nothing written yet, but visible to readers
+        self.assertEqual(backend, {})
+        self.assertEqual(cache["a"], 1)
+        self.assertEqual(dict(cache.items()), {"a": 1, "b": 2})
+        cache.flush()
+        self.assertEqual(backend, {"a": 1, "b": 2})
+        self.assertEqual(backend.stores, 1)
+
+        del cache["a"]
+        self.assertIn("a", backend)
+        self.assertNotIn("a", cache)
+        cache.close()
+        self.assertEqual(backend, {"b": 2})
+        self.assertEqual(cache.flushes, 2)
+
+    def test_background_flush(self):
+        backend = FakeBackend()
+        cache = BoundedCache(backend, flush_interval=0.05)
+        cache["a"] = 1
+        cache.store()
+        sleep(0.3)
+        self.assertEqual(backend, {"a": 1})
+        cache.close()
+
+    def test_max_pending(self):
+        backend = FakeBackend()
+        cache = BoundedCache(backend, flush_interval=60, max_pending=2)
+        cache["a"] = 1
+        cache["b"] = 2
+        sleep(0.3)
+        self.assertEqual(backend, {"a": 1, "b": 2})
+        cache.close()
+
+    def test_sqlite(self):
+        folder = mkdtemp()
+        cache = BoundedCache(SQLiteCache("test", xdg_folder=folder),
+                             flush_interval=60)
+        cache.update({"a": 1})
+        cache["b"] = 2
+        other = SQLiteCache("test", xdg_folder=folder)
+        self.assertEqual(len(other), 0)
+        # pending entries are not forgotten when syncing with the file
+        self.assertTrue(cache.touch("b"))
+        cache.close()
+        self.assertEqual(dict(other.items()), {"a": 1, "b": 2})
+
+
+class FakeBackend(dict):
+    stores = 0
+
+    def store(self):
+        self.stores += 1
@@ -0,0 +1,115 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import unittest
+from tempfile import mkdtemp
+
+from neon_solvers.cache import BoundedCache, MemoryCache, SQLiteCache
+from neon_solvers.compression import ZLIB_KEY, ZlibCodec, \
+    build_dictionary, cache_footprint
+
+
+def payload(i):
+    return {"short_answer": f"answer {i}",
+            "raw": [{"label": f"field {j}", "value": f"value {i}.{j}"}
+                    for j in range(20)]}
+
+
+class TestZlibCodec(unittest.TestCase):
+    def test_roundtrip(self):
+        codec = ZlibCodec()
+        encoded = codec.encode(payload(1))
+        self.assertIn(ZLIB_KEY, encoded)
+        self.assertEqual(codec.decode(encoded), payload(1))
+        # small values and old uncompressed entries are left alone
+        self.assertEqual(codec.encode("42"), "42")
+        self.assertEqual(codec.decode({"answer": "42"}), {"answer": "42"})
+
+    def test_dictionary(self):
+        zdict = build_dictionary([payload(i) for i in range(50)], size=1024)
+        self.assertLessEqual(len(zdict), 1024)
+        self.assertIn(b"label", zdict)
+        codec = ZlibCodec(zdict=zdict)
+        encoded = codec.encode(payload(99))
+        self.assertLess(len(encoded[ZLIB_KEY]),
+                        len(ZlibCodec().encode(payload(99))[ZLIB_KEY]))
+        self.assertEqual(codec.decode(encoded), payload(99))
+        with self.assertRaises(ValueError):
+            ZlibCodec().decode(encoded)
+
+    def test_from_config(self):
+        self.assertIsNone(ZlibCodec.from_config(None))
+        self.assertEqual(ZlibCodec.from_config(True).level, 6)
+        self.assertEqual(ZlibCodec.from_config({"level": 9}).level, 9)
+
+
+class TestCompressedCache(unittest.TestCase):
+    def test_bounded_cache(self):
+        cache = BoundedCache(MemoryCache(), codec=ZlibCodec(),
+                             max_bytes=10 ** 6)
+        cache["a"] = payload(1)
+        cache.update({"b": payload(2)})
+        self.assertIn(ZLIB_KEY, cache.backend["a"])
+        self.assertEqual(cache["a"], payload(1))
+        self.assertEqual(dict(cache.items()), {"a": payload(1),
+                                               "b": payload(2)})
+        footprint = cache_footprint(cache)
+        self.assertEqual(footprint["entries"], 2)
+        self.assertLess(footprint["stored_bytes"], footprint["raw_bytes"])
+        # max_bytes counts compressed sizes
+        self.assertLess(cache.stats["bytes"], footprint["raw_bytes"])
+
+    def test_undecodable_entries(self):
+        folder = mkdtemp()
+        zdict = build_dictionary([payload(i) for i in range(50)], size=1024)
+        cache = BoundedCache(SQLiteCache("test", xdg_folder=folder),
+                             codec=ZlibCodec(zdict=zdict))
+        cache["a"] = payload(1)
+        cache["b"] = payload(2)
+        cache.close()
+
+        # the dictionary changed, old entries are misses and get dropped
+        cache = BoundedCache(SQLiteCache("test", xdg_folder=folder),
+                             codec=ZlibCodec())
+        self.assertNotIn("a", cache)
+        self.assertFalse(cache.touch("b"))
+        self.assertEqual(cache.stats["misses"], 1)
+        self.assertEqual(cache.stats["undecodable"], 2)
+        self.assertEqual(len(cache), 0)
+        cache["a"] = payload(3)
+        self.assertIn("a", cache)
+        self.assertTrue(cache.touch("a"))
+        self.assertEqual(cache["a"], payload(3))
+
+    def test_write_behind(self):
+        folder = mkdtemp()
+        cache = BoundedCache(SQLiteCache("test", xdg_folder=folder),
+                             codec=ZlibCodec(), flush_interval=60)
+        cache["a"] = payload(1)
+        self.assertEqual(cache["a"], payload(1))
+        cache.close()
+        self.assertIn(ZLIB_KEY, SQLiteCache("test", xdg_folder=folder)["a"])
@@ -0,0 +1,79 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import unittest
+
+from neon_solvers.metrics import MemorySink, NULL_SINK, PrometheusSink, \
+    StatsdSink, create_metrics_sink
+
+
+class TestMetrics(unittest.TestCase):
+    def test_null_sink(self):
+        self.assertFalse(NULL_SINK.enabled)
+        self.assertIs(create_metrics_sink(None), NULL_SINK)
+        with NULL_SINK.span("backend"):
+            pass
+
+    def test_memory_sink(self):
+        sink = create_metrics_sink("memory")
+        self.assertIsInstance(sink, MemorySink)
+        with sink.span("backend", {"solver": "a"}):
+            pass
+        with self.assertRaises(ValueError):
+            with sink.span("backend", {"solver": "b"}):
+                raise ValueError("boom")
+        sink.increment("cache_hits", tags={"solver": "a"})
+        self.assertEqual(len(sink.times("backend")), 2)
+        self.assertEqual(len(sink.times("backend", solver="a")), 1)
+        self.assertEqual(sink.count("errors"), 1)
+        self.assertEqual(sink.count("errors", stage="backend", solver="b"), 1)
+        self.assertEqual(sink.count("cache_hits", solver="a"), 1)
+
+    def test_prometheus(self):
+        sink = PrometheusSink()
+        sink.timing("backend", 0.5, {"solver": "a"})
+        sink.timing("backend", 0.25, {"solver": "a"})
+        sink.increment("cache_misses", tags={"solver": 'say "hi"'})
+        text = sink.render()
+        self.assertIn("# TYPE neon_solvers_backend_seconds summary", text)
+        self.assertIn('neon_solvers_backend_seconds_count{solver="a"} 2',
+                      text)
+        self.assertIn('neon_solvers_backend_seconds_sum{solver="a"} 0.75',
+                      text)
+        self.assertIn('neon_solvers_cache_misses_total{solver="say \\"hi\\""}'
+                      ' 1', text)
+
+    def test_statsd(self):
+        lines = []
+        sink = create_metrics_sink({"sink": "statsd", "send": lines.append})
+        self.assertIsInstance(sink, StatsdSink)
+        sink.timing("backend", 0.0125, {"solver": "a"})
+        sink.increment("cache_hits")
+        self.assertEqual(lines, ["neon_solvers.backend:12.5|ms|#solver:a",
+                                 "neon_solvers.cache_hits:1|c"])
+        with self.assertRaises(ValueError):
+            create_metrics_sink("unknown")
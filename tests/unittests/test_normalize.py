@@ -0,0 +1,74 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from neon_solvers.normalize import NORMALIZERS, QueryNormalizer, \
+    register_normalizer
+
+
+class TestQueryNormalizer(unittest.TestCase):
+    def test_default_pipeline(self):
+        normalizer = QueryNormalizer()
+        for query in ("What is the speed of light?",
+                      "what's the speed of light",
+                      "What’s   the SPEED of light!!"):
+            self.assertEqual(normalizer.normalize(query),
+                             "what is the speed of light")
+        self.assertEqual(normalizer.normalize("who is Newton's mom"),
+                         "who is newtons mom")
+
+    def test_numbers(self):
+        normalizer = QueryNormalizer()
+        for query, expected in (("what is 2.5 + 3.5?", "what is 2.5 + 3.5"),
+                                ("3/4 of 100", "3/4 of 100"),
+                                ("What is -5 squared?", "what is -5 squared"),
+                                ("10% of 50", "10% of 50"),
+                                ("1,000 times 10:30", "1,000 times 10:30"),
+                                ("what is 2 + 2.", "what is 2 + 2"),
+                                ("one, two... well-known",
+                                 "one two well known")):
+            self.assertEqual(normalizer.normalize(query), expected)
+
+    def test_options(self):
+        normalizer = QueryNormalizer(lowercase=False, stopwords=True)
+        self.assertEqual(normalizer.normalize("What's the Answer, please?"),
+                         "what is Answer")
+        normalizer = QueryNormalizer(punctuation=False, contractions=False)
+        self.assertEqual(normalizer.normalize("What's  up?"), "what's up?")
+
+    def test_languages(self):
+        normalizer = QueryNormalizer()
+        # no contraction table for pt, generic steps still apply
+        self.assertEqual(normalizer.normalize("Quem é Isaac Newton?", "pt"),
+                         "quem é isaac newton")
+        register_normalizer("pt-PT", lambda query: query.upper())
+        try:
+            self.assertEqual(normalizer.normalize("quem é", "pt"), "QUEM É")
+        finally:
+            NORMALIZERS.pop("pt")
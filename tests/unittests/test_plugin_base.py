@@ -26,17 +26,24 @@
 # NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import asyncio
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import mkdtemp
+from threading import Thread
+from time import monotonic, sleep
 from unittest.mock import Mock
 
 from neon_solvers import AbstractSolver
+from neon_solvers.cache import BoundedCache, SQLiteCache
+from neon_solvers.solver import RecentFailure
 
 
 class MySolver(AbstractSolver):
-    def __init__(self):
+    def __init__(self, config=None):
         # set the "internal" language, defined by dev, not user
         # this plugin only accepts and outputs english
-        config = {"lang": "en"}
+        config = {"lang": "en", **(config or {})}
         super(MySolver, self).__init__(name="MySolver", priority=100,
                                        config=config)
 
@@ -97,7 +104,7 @@ class TestSolverBaseMethods(unittest.TestCase):
 
     def test_get_expanded(self):
         solver = MySolver()
-        solver.cache.clear()
+        solver.steps_cache.clear()
         solver.get_expanded_answer = Mock()
         solver.get_expanded_answer.return_value = []
 
@@ -106,7 +113,7 @@ class TestSolverBaseMethods(unittest.TestCase):
 
     def test_get_image(self):
         solver = MySolver()
-        solver.cache.clear()
+        solver.image_cache.clear()
         solver.get_image = Mock()
         solver.get_image.return_value = "42.jpeg"
 
@@ -164,7 +171,8 @@ class TestSolverBaseMethods(unittest.TestCase):
 
     def test_translation(self):
         solver = MySolver()
-        solver.translator.translate = Mock()
+        solver.translation_cache.clear()
+        solver.translator = Mock()
         solver.translator.translate.return_value = "a wild translation appears"
 
         # no translation
@@ -174,3 +182,540 @@ class TestSolverBaseMethods(unittest.TestCase):
         # translation
         ans = solver.spoken_answer("not english", context={"lang": "unk"})
         solver.translator.translate.assert_called()
+
+    def test_sqlite_cache_backend(self):
+        solver = MySolver({"cache_backend": "sqlite",
+                           "cache_folder": mkdtemp()})
+        solver.get_spoken_answer = Mock()
+        solver.get_spoken_answer.return_value = "42"
+
+        self.assertEqual(solver.spoken_answer("some query"), "42")
+        self.assertEqual(solver.spoken_answer("some query"), "42")
+        solver.get_spoken_answer.assert_called_once()
+        self.assertEqual(solver.spoken_cache["some query"], "42")
+
+    def test_cache_limits(self):
+        solver = MySolver({"cache_max_entries": 1, "cache_ttl": 3600,
+                           "cache_folder": mkdtemp(),
+                           "memory_cache_max_entries": 0})
+        solver.spoken_answer("some query")
+        solver.spoken_answer("some query")
+        solver.spoken_answer("another query")
+        self.assertEqual(solver.spoken_cache.keys(), ["another query"])
+        stats = solver.cache_stats["spoken"]
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["evictions"], 1)
+
+    def test_memory_cache(self):
+        solver = MySolver({"cache_folder": mkdtemp()})
+        solver.translator = Mock()
+        solver.translator.translate.return_value = "a wild translation appears"
+        solver.get_spoken_answer = Mock()
+        solver.get_spoken_answer.return_value = "42"
+
+        ans = solver.spoken_answer("not english", context={"lang": "unk"})
+        self.assertEqual(ans, "a wild translation appears")
+        self.assertEqual(solver.translator.translate.call_count, 2)
+
+        # served from memory, no translation round trips
+        ans = solver.spoken_answer("Not  English", context={"lang": "unk"})
+        self.assertEqual(ans, "a wild translation appears")
+        self.assertEqual(solver.translator.translate.call_count, 2)
+        solver.get_spoken_answer.assert_called_once()
+        self.assertEqual(solver.cache_stats["memory"]["hits"], 1)
+
+        # memory entries are dropped with the persistent cache
+        solver.spoken_cache.clear()
+        solver.spoken_answer("not english", context={"lang": "unk"})
+        self.assertEqual(solver.get_spoken_answer.call_count, 2)
+
+    def test_lookup_race(self):
+        class EvictingCache(BoundedCache):
+            """ another thread evicts the entry right after it was found """
+            def __contains__(self, key):
+                hit = super().__contains__(key)
+                evict = Thread(target=self.pop, args=(key, None))
+                evict.start()
+                evict.join(0.1)
+                return hit
+
+        solver = MySolver({"cache_folder": mkdtemp()})
+        solver.get_spoken_answer = Mock(return_value="42")
+        self.assertEqual(solver.spoken_answer("what"), "42")
+        solver.memory_cache.clear()
+        solver.spoken_cache.__class__ = EvictingCache
+        solver.memory_cache.__class__ = EvictingCache
+        # the entry is read before the eviction, not a KeyError
+        self.assertEqual(solver.spoken_answer("what"), "42")
+        self.assertEqual(solver.spoken_answer("what"), "42")
+        self.assertEqual(solver.spoken_answer("what"), "42")
+
+    def test_translation_cache(self):
+        solver = MySolver({"cache_folder": mkdtemp(),
+                           "memory_cache_max_entries": 0})
+        solver.translator = Mock()
+        solver.translator.translate.side_effect = lambda text, tgt, src: \
+            f"{src}->{tgt}: {text}"
+
+        steps = solver.long_answer("not english", context={"lang": "unk"})
+        self.assertEqual(steps[0]["summary"], "en->unk: we forgot the question")
+        calls = solver.translator.translate.call_count
+        self.assertGreater(calls, 0)
+
+        # same texts are never translated twice
+        solver.long_answer("not english", context={"lang": "unk"})
+        self.assertEqual(solver.translator.translate.call_count, calls)
+        self.assertIn("unk:en:not english", solver.translation_cache)
+
+        # plugin output is not modified in place
+        data = {"answer": "42", "nested": ["a"]}
+        self.assertEqual(solver._translate_dict(data, "unk", "en"),
+                         {"answer": "en->unk: 42",
+                          "nested": ["en->unk: a"]})
+        self.assertEqual(data, {"answer": "42", "nested": ["a"]})
+
+    def test_long_answer_cache(self):
+        solver = MySolver({"cache_folder": mkdtemp(),
+                           "memory_cache_max_entries": 0})
+        solver.get_expanded_answer = Mock(return_value=[])
+        solver.get_spoken_answer = Mock(return_value="first. second.")
+        solver.get_image = Mock(return_value="img.jpg")
+
+        self.assertEqual(solver.spoken_answer("some query"), "first. second.")
+        steps = solver.long_answer("some query")
+        self.assertEqual([s["summary"] for s in steps], ["first.", "second."])
+        self.assertEqual(steps[0]["img"], "img.jpg")
+        # the fallback reuses the cached spoken answer
+        solver.get_spoken_answer.assert_called_once()
+
+        self.assertEqual(solver.long_answer("some query"), steps)
+        self.assertEqual(solver.visual_answer("some query"), "img.jpg")
+        solver.get_expanded_answer.assert_called_once()
+        solver.get_image.assert_called_once()
+        # no expanded answer is remembered in the negative cache
+        self.assertEqual(solver.cache_stats["negative"]["hits"], 1)
+
+    def test_combined_record(self):
+        solver = MySolver({"cache_folder": mkdtemp()})
+        self.assertFalse(solver.uses_records)
+        record = {"data": {"short_answer": "42"},
+                  "spoken_answer": "the answer is 42. it is known.",
+                  "image": "42.jpg"}
+        solver.get_record = Mock(return_value=record)
+        solver.get_spoken_answer = Mock(return_value="unused")
+        solver.get_expanded_answer = Mock(return_value=[])
+        self.assertTrue(solver.uses_records)
+
+        self.assertEqual(solver.spoken_answer("the question"),
+                         "the answer is 42. it is known.")
+        self.assertEqual(solver.search("the question"),
+                         {"short_answer": "42"})
+        self.assertEqual(solver.visual_answer("the question"), "42.jpg")
+        # no steps in the record, built from the spoken answer and image
+        steps = solver.long_answer("the question")
+        self.assertEqual([s["summary"] for s in steps],
+                         ["the answer is 42.", "it is known."])
+        self.assertEqual(steps[0]["img"], "42.jpg")
+        self.assertEqual(solver.spoken_answer_batch(["the question"]),
+                         ["the answer is 42. it is known."])
+        solver.get_record.assert_called_once()
+        solver.get_spoken_answer.assert_not_called()
+        solver.get_expanded_answer.assert_called_once()
+        self.assertEqual(solver.cache_stats["record"]["entries"], 1)
+
+    def test_negative_cache(self):
+        solver = MySolver({"cache_folder": mkdtemp(),
+                           "negative_cache_ttl": 60})
+        solver.get_spoken_answer = Mock(return_value="")
+        solver.get_data = Mock(side_effect=ValueError("backend down"))
+
+        for _ in range(3):
+            self.assertIsNone(solver.spoken_answer("junk"))
+            self.assertEqual(solver.search("junk"), {})
+        solver.get_spoken_answer.assert_called_once()
+        solver.get_data.assert_called_once()
+        # empty answers are not persisted
+        self.assertNotIn("junk", solver.spoken_cache)
+        self.assertEqual(solver.cache_stats["negative"]["entries"], 2)
+
+        # retried once the entry expires
+        for entry in solver.negative_cache._meta.values():
+            entry[0] -= 61
+        solver.spoken_answer("junk")
+        self.assertEqual(solver.get_spoken_answer.call_count, 2)
+
+        solver = MySolver({"cache_folder": mkdtemp(),
+                           "negative_cache_ttl": 0})
+        solver.get_spoken_answer = Mock(return_value="")
+        solver.spoken_answer("junk")
+        solver.spoken_answer("junk")
+        self.assertEqual(solver.get_spoken_answer.call_count, 2)
+
+    def test_negative_cache_failures(self):
+        solver = MySolver({"cache_folder": mkdtemp()})
+        solver.get_spoken_answer = Mock(side_effect=ValueError("down"))
+        with self.assertRaises(ValueError):
+            solver.spoken_answer("junk")
+        # still a failure, without calling the plugin again
+        with self.assertRaises(RecentFailure):
+            solver.spoken_answer("junk")
+        solver.get_spoken_answer.assert_called_once()
+        self.assertEqual(solver.spoken_answer_batch(["junk"]), [None])
+
+    def test_negative_cache_copies(self):
+        solvers = [MySolver({"cache_folder": mkdtemp()}) for _ in range(2)]
+        for solver in solvers:
+            solver.get_data = Mock(side_effect=ValueError("backend down"))
+        solvers[0].search("junk")
+        # answered by the negative cache
+        answer = solvers[0].search("junk")
+        answer["poison"] = 1
+        self.assertEqual(solvers[0].search("junk"), {})
+        self.assertEqual(solvers[1].search("junk"), {})
+        self.assertEqual(solvers[1].search("junk"), {})
+
+    def test_compact_cache(self):
+        solver = MySolver({"cache_folder": mkdtemp(),
+                           "cache_compression": True,
+                           "cache_fields": ["answer"]})
+        raw = {"answer": "42", "raw": ["unused"] * 100}
+        solver.get_data = Mock(return_value=raw)
+        self.assertEqual(solver.search("the question"), {"answer": "42"})
+        self.assertEqual(solver.cache["the question"], {"answer": "42"})
+
+        solver.get_spoken_answer = Mock(return_value="a long answer " * 50)
+        solver.spoken_answer("the question")
+        stored = solver.spoken_cache.backend["the question"]
+        self.assertIn("~zlib", stored)
+        self.assertEqual(solver.spoken_cache["the question"],
+                         "a long answer " * 50)
+
+    def test_normalization(self):
+        solver = MySolver({"cache_folder": mkdtemp(),
+                           "memory_cache_max_entries": 0})
+        solver.get_spoken_answer = Mock(return_value="about 300000 km/s")
+
+        solver.spoken_answer("What is the speed of light?")
+        solver.spoken_answer("what's the speed of light")
+        # the normalized query is the cache key, plugins get it as asked
+        solver.get_spoken_answer.assert_called_once_with(
+            "What is the speed of light?",
+            {"lang": "en", "raw_query": "What is the speed of light?",
+             "query_normalized": True})
+        self.assertEqual(solver.cache_stats["normalization"],
+                         {"lookups": 2, "changed": 2, "changed_hits": 1})
+
+        solver = MySolver({"cache_folder": mkdtemp(),
+                           "normalization": False})
+        solver.get_spoken_answer = Mock(return_value="42")
+        solver.spoken_answer("What is X?")
+        solver.get_spoken_answer.assert_called_once_with(
+            "What is X?", {"lang": "en", "raw_query": "What is X?"})
+
+    def test_numeric_queries(self):
+        solver = MySolver({"cache_folder": mkdtemp(),
+                           "memory_cache_max_entries": 0})
+        solver.get_spoken_answer = Mock(side_effect=lambda q, c: f"ans {q}")
+        self.assertEqual(solver.spoken_answer("what is 5 squared"),
+                         "ans what is 5 squared")
+        # not merged with "5 squared" by normalization
+        self.assertEqual(solver.spoken_answer("what is -5 squared?"),
+                         "ans what is -5 squared?")
+        self.assertEqual(solver.spoken_answer("What is -5 squared"),
+                         "ans what is -5 squared?")
+        self.assertEqual(solver.get_spoken_answer.call_count, 2)
+
+    def test_fuzzy_match(self):
+        solver = MySolver({"cache_folder": mkdtemp(),
+                           "memory_cache_max_entries": 0,
+                           "fuzzy_match_threshold": 0.8})
+        solver.get_spoken_answer = Mock(return_value="about 300000 km/s")
+        solver.get_data = Mock(return_value={"answer": "299792458 m/s"})
+
+        solver.spoken_answer("what is the speed of light")
+        context = {"lang": "en"}
+        self.assertEqual(solver.spoken_answer("whats the speed of light",
+                                              context),
+                         "about 300000 km/s")
+        solver.get_spoken_answer.assert_called_once()
+        self.assertEqual(context["fuzzy_match"]["query"],
+                         "what is the speed of light")
+        self.assertGreaterEqual(context["fuzzy_match"]["score"], 0.8)
+
+        solver.search("what is the speed of light")
+        data = solver.search("whats the speed of light")
+        self.assertEqual(data["answer"], "299792458 m/s")
+        self.assertGreaterEqual(data["match_score"], 0.8)
+        solver.get_data.assert_called_once()
+
+        # unrelated queries and evicted entries are not matched
+        solver.spoken_answer("who is isaac newton")
+        self.assertEqual(solver.get_spoken_answer.call_count, 2)
+        solver.spoken_cache.clear()
+        solver.spoken_answer("whats the speed of light")
+        self.assertEqual(solver.get_spoken_answer.call_count, 3)
+        self.assertEqual(solver.cache_stats["fuzzy"], {"hits": 2})
+
+    def test_metrics(self):
+        solver = MySolver({"cache_folder": mkdtemp(), "metrics": "memory"})
+        solver.translator = Mock()
+        solver.translator.translate.side_effect = lambda text, tgt, src: text
+        solver.get_spoken_answer = Mock(return_value="42")
+
+        solver.spoken_answer("what is the answer", {"lang": "pt"})
+        solver.spoken_answer("what is the question", {"lang": "pt"})
+        metrics = solver.metrics
+        self.assertEqual(metrics.count("cache_misses", solver="MySolver"), 2)
+        self.assertEqual(metrics.count("backend_calls"), 2)
+        # the answer "42" is only translated once
+        self.assertEqual(metrics.count("translation_calls"), 3)
+        for stage in ("tx_query", "cache_lookup", "backend", "store",
+                      "tx_answer"):
+            self.assertEqual(len(metrics.times(stage)), 2, stage)
+
+        solver.memory_cache.clear()
+        solver.spoken_answer("what is the answer", {"lang": "pt"})
+        self.assertEqual(metrics.count("cache_hits"), 1)
+
+        solver.get_data = Mock(side_effect=ValueError("backend down"))
+        self.assertEqual(solver.search("what is broken"), {})
+        self.assertEqual(metrics.count("errors", stage="backend"), 1)
+
+    def test_write_behind(self):
+        folder = mkdtemp()
+        solver = MySolver({"cache_folder": folder, "cache_backend": "sqlite",
+                           "cache_flush_interval": 60})
+        solver.get_spoken_answer = Mock(return_value="42")
+        self.assertEqual(solver.spoken_answer("what is the answer"), "42")
+        path = solver.spoken_cache.path
+        db = SQLiteCache("MySolver", xdg_folder=folder)
+        self.assertEqual(db.path, path)
+        # answered without waiting for the disk
+        self.assertNotIn("what is the answer", db)
+        solver.shutdown()
+        self.assertEqual(db["what is the answer"], "42")
+
+    def test_shared_handles(self):
+        config = {"cache_folder": mkdtemp(), "cache_backend": "sqlite"}
+        solvers = [MySolver(config), MySolver(config)]
+        self.assertIs(solvers[0].spoken_cache, solvers[1].spoken_cache)
+        self.assertIs(solvers[0].translator, solvers[1].translator)
+
+        backend = solvers[0].spoken_cache.backend
+        backend.close = Mock()
+        solvers[0].shutdown()
+        backend.close.assert_not_called()
+        solvers[1].shutdown()
+        backend.close.assert_called_once()
+
+    def test_reuse_after_shutdown(self):
+        solver = MySolver({"cache_folder": mkdtemp(),
+                           "cache_backend": "sqlite",
+                           "fuzzy_match_threshold": 0.8})
+        solver.get_spoken_answer = Mock(return_value="42")
+        self.assertEqual(solver.spoken_answer("the question"), "42")
+        cache = solver.spoken_cache
+        solver.shutdown()
+        self.assertEqual(len(solver.memory_cache), 0)
+        self.assertEqual(cache._listeners, [])
+        # caches are acquired again, answered from the reopened sqlite file
+        self.assertEqual(solver.spoken_answer("the question"), "42")
+        solver.get_spoken_answer.assert_called_once()
+        solver.shutdown()
+
+
+class AsyncSolver(AbstractSolver):
+    def __init__(self):
+        super().__init__(name="AsyncSolver", config={"lang": "en",
+                                                     "cache_backend": "memory"})
+        self.calls = 0
+
+    async def aget_spoken_answer(self, query, context):
+        self.calls += 1
+        await asyncio.sleep(0.1)
+        return f"answer to {query}"
+
+
+class TestSolverAsyncMethods(unittest.TestCase):
+    def test_blocking_plugin(self):
+        solver = MySolver({"cache_folder": mkdtemp()})
+
+        async def ask():
+            return await asyncio.gather(solver.aspoken_answer("some query"),
+                                        solver.asearch("some query"),
+                                        solver.avisual_answer("some query"),
+                                        solver.along_answer("some query"))
+
+        spoken, data, image, steps = asyncio.run(ask())
+        self.assertEqual(spoken, solver.spoken_answer("some query"))
+        self.assertEqual(data, {"error": "404 answer not found"})
+        self.assertEqual(image, "http://stock.image.jpg")
+        self.assertEqual(steps, solver.get_expanded_answer("some query"))
+
+    def test_async_plugin(self):
+        solver = AsyncSolver()
+
+        async def ask():
+            questions = [f"question {i}" for i in range(100)]
+            return await asyncio.gather(
+                *[solver.aspoken_answer(q) for q in questions])
+
+        start = monotonic()
+        answers = asyncio.run(ask())
+        # all questions run concurrently on the event loop
+        self.assertLess(monotonic() - start, 1)
+        self.assertEqual(answers[0], "answer to question 0")
+        self.assertEqual(solver.calls, 100)
+
+        data = asyncio.run(solver.asearch("question 0"))
+        self.assertEqual(data, {"short_answer": "answer to question 0"})
+
+    def test_async_record(self):
+        solver = AsyncSolver()
+        solver.name = "AsyncRecordSolver"
+        calls = []
+
+        async def aget_record(query, context=None):
+            calls.append(query)
+            await asyncio.sleep(0.1)
+            return {"spoken_answer": "42", "image": "42.jpg", "steps": []}
+
+        solver.aget_record = aget_record
+
+        async def ask():
+            return await asyncio.gather(solver.aspoken_answer("question"),
+                                        solver.avisual_answer("question"))
+
+        self.assertEqual(asyncio.run(ask()), ["42", "42.jpg"])
+        self.assertEqual(calls, ["question"])
+        self.assertEqual(solver.calls, 0)
+
+    def test_concurrent_misses(self):
+        solver = AsyncSolver()
+        answers = asyncio.run(self._ask_many(solver, "same question"))
+        self.assertEqual(set(answers), {"answer to same question"})
+        self.assertEqual(solver.calls, 1)
+
+    @staticmethod
+    async def _ask_many(solver, question):
+        return await asyncio.gather(
+            *[solver.aspoken_answer(question) for _ in range(10)])
+
+
+class TestSolverConcurrency(unittest.TestCase):
+    def test_concurrent_misses(self):
+        solver = MySolver({"cache_folder": mkdtemp()})
+        calls = []
+
+        def get_spoken_answer(query, context=None):
+            calls.append(query)
+            sleep(0.2)
+            return "42"
+
+        solver.get_spoken_answer = get_spoken_answer
+        solver.spoken_cache.store = Mock()
+        with ThreadPoolExecutor(10) as pool:
+            answers = list(pool.map(solver.spoken_answer,
+                                    ["trending question"] * 10))
+        self.assertEqual(answers, ["42"] * 10)
+        self.assertEqual(calls, ["trending question"])
+        solver.spoken_cache.store.assert_called_once()
+
+
+class TestSolverBatchMethods(unittest.TestCase):
+    def test_spoken_answer_batch(self):
+        solver = MySolver({"cache_folder": mkdtemp()})
+        solver.get_spoken_answer = Mock(side_effect=lambda q, c: f"ans {q}")
+        solver.spoken_cache["cached"] = "from cache"
+        solver.spoken_cache.store = Mock()
+
+        answers = solver.spoken_answer_batch(["a", "b", "a", "cached"])
+        self.assertEqual(answers, ["ans a", "ans b", "ans a", "from cache"])
+        # duplicates and cached queries do not reach the backend
+        self.assertEqual(solver.get_spoken_answer.call_count, 2)
+        solver.spoken_cache.store.assert_called_once()
+        self.assertEqual(solver.spoken_answer("b"), "ans b")
+        self.assertEqual(solver.get_spoken_answer.call_count, 2)
+
+    def test_batch_translate_list(self):
+        from ovos_plugin_manager.templates.language import LanguageTranslator
+
+        class ListTranslator(LanguageTranslator):
+            calls = []
+
+            def translate(self, text, target=None, source=None):
+                raise AssertionError("translated one at a time")
+
+            def translate_list(self, data, lang_tgt, lang_src="en"):
+                self.calls.append(list(data))
+                return [f"{lang_tgt}: {text}" for text in data]
+
+        solver = MySolver({"cache_folder": mkdtemp()})
+        solver.translation_cache.clear()
+        solver.translator = ListTranslator()
+        solver.get_spoken_answer = Mock(side_effect=lambda q, c: f"ans {q}")
+        answers = solver.spoken_answer_batch(["um", "dois", "um"], lang="pt")
+        self.assertEqual(answers, ["pt: ans en: um", "pt: ans en: dois",
+                                   "pt: ans en: um"])
+        # one call for the queries, one for the answers
+        self.assertEqual(ListTranslator.calls,
+                         [["um", "dois"], ["ans en: um", "ans en: dois"]])
+
+    def test_search_batch_translation(self):
+        solver = MySolver({"cache_folder": mkdtemp()})
+        solver.translator = Mock()
+        solver.translator.translate.side_effect = \
+            lambda text, tgt, src: f"{tgt}: {text}"
+        solver.get_data = Mock(side_effect=lambda q, c: {"answer": q})
+
+        answers = solver.search_batch(["um", "dois", "um"], lang="pt")
+        # plugins receive the translated query before normalization
+        self.assertEqual(answers, [{"answer": "pt: en: um"},
+                                   {"answer": "pt: en: dois"},
+                                   {"answer": "pt: en: um"}])
+        # 2 unique inputs + 2 unique outputs
+        self.assertEqual(solver.translator.translate.call_count, 4)
+
+    def test_batch_errors(self):
+        solver = MySolver({"cache_folder": mkdtemp()})
+
+        def get_data(query, context):
+            if query == "bad":
+                raise RuntimeError("backend down")
+            return {"answer": query}
+
+        solver.get_data = get_data
+        self.assertEqual(solver.search_batch(["good", "bad"]),
+                         [{"answer": "good"}, {}])
+        self.assertNotIn("bad", solver.cache)
+
+
+class TestSolverStreamingMethods(unittest.TestCase):
+    def test_spoken_answers(self):
+        solver = MySolver({"cache_folder": mkdtemp()})
+        solver.get_spoken_answer = Mock(
+            return_value="First sentence. Second sentence. Third one.")
+        solver.translator = Mock()
+        solver.translator.translate.side_effect = \
+            lambda text, tgt, src: f"{tgt}: {text}"
+
+        sentences = solver.spoken_answers("some query", lang="pt")
+        # only the query is translated before the first sentence is read
+        self.assertEqual(next(sentences), "pt: First sentence.")
+        self.assertEqual(solver.translator.translate.call_count, 2)
+        self.assertEqual(list(sentences), ["pt: Second sentence.",
+                                           "pt: Third one."])
+        self.assertEqual(solver.translator.translate.call_count, 4)
+
+        # fully consumed answers are served from memory
+        self.assertEqual(list(solver.spoken_answers("some query", lang="pt")),
+                         ["pt: First sentence.", "pt: Second sentence.",
+                          "pt: Third one."])
+        self.assertEqual(solver.translator.translate.call_count, 4)
+        solver.get_spoken_answer.assert_called_once()
+
+    def test_long_answers(self):
+        solver = MySolver({"cache_folder": mkdtemp()})
+        self.assertEqual(list(solver.long_answers("some query")),
+                         solver.long_answer("some query"))
@@ -0,0 +1,547 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import multiprocessing
+import os
+import unittest
+from threading import Lock
+from time import monotonic, sleep
+from unittest.mock import Mock, patch
+
+from neon_solvers import AbstractSolver, NeonSolversService
+from neon_solvers.breaker import CircuitBreaker
+
+
+def make_solver(name, priority, answer, delay=0.0, lang="en"):
+    class DelayedSolver(AbstractSolver):
+        def __init__(self):
+            super().__init__(name=name, priority=priority,
+                             config={"lang": lang, "cache_backend": "memory"})
+
+        def get_spoken_answer(self, query, context=None):
+            sleep(delay)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+
+    return DelayedSolver
+
+
+def entry_points(plugins):
+    """ installed solver entry points, loading returns the plugin class """
+    return {name: Mock(load=Mock(return_value=plug))
+            for name, plug in plugins.items()}
+
+
+def make_service(plugins, plugin_config=None, bus=None, **config):
+    config.update({name: {} for name in plugins})
+    config.update(plugin_config or {})
+    with patch("neon_solvers._solver_entry_points",
+               return_value=entry_points(plugins)):
+        return NeonSolversService(bus=bus, config={"solvers": config})
+
+
+class FakeMessage:
+    def __init__(self, msg_type, data=None, context=None):
+        self.msg_type = msg_type
+        self.data = data or {}
+        self.context = context or {}
+
+    def reply(self, msg_type, data=None):
+        return FakeMessage(msg_type, data, dict(self.context))
+
+
+class FakeBus:
+    """ in memory message bus, handlers run synchronously on emit """
+
+    def __init__(self):
+        self.handlers = {}
+        self.emitted = []
+        self.lock = Lock()
+
+    def on(self, msg_type, handler):
+        self.handlers.setdefault(msg_type, []).append(handler)
+
+    def remove(self, msg_type, handler):
+        self.handlers.get(msg_type, []).remove(handler)
+
+    def emit(self, message):
+        with self.lock:
+            self.emitted.append(message)
+        for handler in self.handlers.get(message.msg_type, []):
+            handler(message)
+
+    def wait_for(self, msg_type, count=1, timeout=2):
+        start = monotonic()
+        while monotonic() - start < timeout:
+            with self.lock:
+                found = [m for m in self.emitted if m.msg_type == msg_type]
+            if len(found) >= count:
+                return found
+            sleep(0.01)
+        return found
+
+
+class TestNeonSolversService(unittest.TestCase):
+    def test_sequential(self):
+        service = make_service({
+            "high": make_solver("high", 90, ""),
+            "low": make_solver("low", 10, "low answer"),
+            "mid": make_solver("mid", 50, "mid answer")})
+        self.assertEqual(service.spoken_answers("question"), "mid answer")
+        service.shutdown()
+
+    def test_parallel_priority(self):
+        service = make_service({
+            "high": make_solver("high", 90, "high answer", 0.2),
+            "low": make_solver("low", 10, "low answer")}, parallel=True)
+        start = monotonic()
+        self.assertEqual(service.spoken_answers("question"), "high answer")
+        self.assertLess(monotonic() - start, 0.4)
+        service.shutdown()
+
+    def test_parallel_latency(self):
+        service = make_service({
+            "a": make_solver("a", 90, "", 0.2),
+            "b": make_solver("b", 50, RuntimeError("failed"), 0.2),
+            "c": make_solver("c", 10, "c answer", 0.2)})
+        start = monotonic()
+        self.assertEqual(service.spoken_answers("question", parallel=True),
+                         "c answer")
+        # roughly the slowest solver, not the sum of all of them
+        self.assertLess(monotonic() - start, 0.5)
+        service.shutdown()
+
+    def test_parallel_deadline(self):
+        service = make_service({
+            "slow": make_solver("slow", 90, "slow answer", 1.0),
+            "fast": make_solver("fast", 10, "fast answer")})
+        start = monotonic()
+        self.assertEqual(service.spoken_answers("question", parallel=True,
+                                                timeout=0.2),
+                         "fast answer")
+        self.assertLess(monotonic() - start, 0.5)
+        service.shutdown()
+
+    def test_async(self):
+        service = make_service({
+            "high": make_solver("high", 90, "", 0.2),
+            "low": make_solver("low", 10, "low answer", 0.2)})
+
+        self.assertEqual(asyncio.run(service.aspoken_answers("question")),
+                         "low answer")
+        start = monotonic()
+        self.assertEqual(asyncio.run(service.aspoken_answers(
+            "another question", parallel=True)), "low answer")
+        self.assertLess(monotonic() - start, 0.35)
+        service.shutdown()
+
+    def test_plain_solvers(self):
+        class PlainSolver:
+            """ not an AbstractSolver, eg. an ovos QuestionSolver plugin """
+            priority = 90
+
+            def spoken_answer(self, query, context=None):
+                sleep(0.05)
+                return f"plain {query}"
+
+            def shutdown(self):
+                pass
+
+        service = make_service({
+            "plain": PlainSolver,
+            "low": make_solver("low", 10, "low answer")})
+        for parallel in (False, True):
+            self.assertEqual(asyncio.run(service.aspoken_answers(
+                "question", parallel=parallel)), "plain question")
+        self.assertEqual(service.spoken_answers_batch(["a", "b"]),
+                         ["plain a", "plain b"])
+        self.assertEqual(service.breakers["plain"].failures, 0)
+        service.shutdown()
+
+    def test_async_timeout_shared_fetch(self):
+        service = make_service({
+            "shared_slow": make_solver("shared_slow", 90, "slow answer",
+                                       0.3)})
+
+        async def follow():
+            await asyncio.sleep(0.05)
+            return await service.aspoken_answers("shared question")
+
+        async def run():
+            return await asyncio.gather(
+                service.aspoken_answers("shared question", timeout=0.1),
+                follow())
+
+        # the first request giving up must not cancel the second one
+        self.assertEqual(asyncio.run(run()), [None, "slow answer"])
+        service.shutdown()
+
+    def test_solver_timeout(self):
+        for parallel in (False, True):
+            service = make_service({
+                "hung": make_solver("hung", 90, "late answer", 1.0),
+                "ok": make_solver("ok", 10, "ok answer")},
+                plugin_config={"hung": {"solver_timeout": 0.1}})
+            start = monotonic()
+            self.assertEqual(service.spoken_answers("question",
+                                                    parallel=parallel),
+                             "ok answer")
+            self.assertLess(monotonic() - start, 0.5)
+            self.assertEqual(service.breakers["hung"].failures, 1)
+            self.assertEqual(service.breakers["ok"].failures, 0)
+            service.shutdown()
+
+    def test_hung_solver_isolation(self):
+        # abandoned calls of a hung solver must not starve the others
+        service = make_service({
+            "hung": make_solver("hung", 90, "late answer", 1.0),
+            "ok": make_solver("ok", 10, "ok answer")},
+            plugin_config={"hung": {"solver_timeout": 0.1},
+                           "ok": {"solver_timeout": 0.5}})
+        for i in range(4):
+            self.assertEqual(service.spoken_answers(f"question {i}"),
+                             "ok answer")
+        self.assertEqual(service.breakers["ok"].failures, 0)
+        self.assertTrue(service.breakers["hung"].is_open)
+        service.shutdown()
+
+    def test_queued_calls_not_failures(self):
+        service = make_service({
+            "slow": make_solver("slow", 90, "slow answer", 0.3)},
+            solver_timeout=0.5, plugin_config={"slow": {"solver_workers": 1}})
+        executor = service._solver_executor("slow")
+        busy = executor.submit(sleep, 0.4)
+        # waits for a thread past the deadline, the solver is not blamed
+        self.assertIsNone(service.spoken_answers("question", timeout=0.2))
+        self.assertEqual(service.breakers["slow"].failures, 0)
+        busy.result()
+        # the solver timeout starts once the call runs, not when queued
+        executor.submit(sleep, 0.4)
+        self.assertEqual(service.spoken_answers("question"), "slow answer")
+        self.assertEqual(service.breakers["slow"].failures, 0)
+        service.shutdown()
+
+    def test_saturated_solver(self):
+        # no request timeout, the hung solver's only thread stays busy
+        for parallel in (False, True):
+            service = make_service({
+                "stuck": make_solver("stuck", 90, "late answer", 2.0),
+                "ok": make_solver("ok", 10, "ok answer")},
+                plugin_config={"stuck": {"solver_timeout": 0.2,
+                                         "solver_workers": 1}})
+            for i in range(5):
+                start = monotonic()
+                self.assertEqual(service.spoken_answers(f"question {i}",
+                                                        parallel=parallel),
+                                 "ok answer")
+                self.assertLess(monotonic() - start, 0.5)
+            # only the call that actually ran timed out
+            self.assertEqual(service.breakers["stuck"].failures, 1)
+            service.shutdown()
+
+    def test_circuit_breaker(self):
+        service = make_service({
+            "broken": make_solver("broken", 90, RuntimeError("down")),
+            "ok": make_solver("ok", 10, "ok answer")},
+            max_failures=2, cooldown=60)
+        # repeated questions would be answered by the negative cache
+        for i in range(2):
+            self.assertEqual(service.spoken_answers(f"question {i}"),
+                             "ok answer")
+        self.assertTrue(service.breakers["broken"].is_open)
+        self.assertFalse(service._allow("broken"))
+        service.shutdown()
+
+    def test_half_open_trial_kept(self):
+        class EasySolver(make_solver("trial_easy", 90, "")):
+            def get_spoken_answer(self, query, context=None):
+                return "easy answer" if query.startswith("easy") else ""
+
+        service = make_service({
+            "trial_easy": EasySolver,
+            "trial_low": make_solver("trial_low", 10, "low answer")})
+        breaker = service.breakers["trial_low"]
+        breaker.cooldown = 0.05
+        for _ in range(breaker.max_failures):
+            breaker.record_failure()
+        sleep(0.1)
+        # answered before reaching trial_low, its trial is not used up
+        self.assertEqual(service.spoken_answers("easy question"),
+                         "easy answer")
+        self.assertEqual(service.spoken_answers("hard question"),
+                         "low answer")
+        self.assertEqual(breaker.failures, 0)
+        service.shutdown()
+
+
+    def test_negative_cache(self):
+        service = make_service({
+            "neg_broken": make_solver("neg_broken", 90, RuntimeError("down")),
+            "neg_empty": make_solver("neg_empty", 10, "")})
+        for _ in range(3):
+            self.assertIsNone(service.spoken_answers("junk transcript"))
+        for module in service.modules:
+            self.assertEqual(module.cache_stats["negative"]["hits"], 2)
+        service.shutdown()
+
+    def test_negative_cache_failures(self):
+        service = make_service({
+            "neg_failing": make_solver("neg_failing", 90,
+                                       RuntimeError("down")),
+            "neg_fallback": make_solver("neg_fallback", 10, "answer")},
+            max_failures=10)
+        failures = []
+        for question in ("a", "b", "a", "c"):
+            self.assertEqual(service.spoken_answers(question), "answer")
+            failures.append(service.breakers["neg_failing"].failures)
+        # remembered failures are not successes
+        self.assertEqual(failures, [1, 2, 3, 4])
+        module = service.loaded_modules["neg_failing"]
+        self.assertEqual(module.cache_stats["negative"]["hits"], 1)
+        service.shutdown()
+
+    def test_batch(self):
+        class PartialSolver(make_solver("partial", 90, "")):
+            def get_spoken_answer(self, query, context=None):
+                return "partial answer" if query == "easy" else ""
+
+        service = make_service({
+            "partial": PartialSolver,
+            "fallback": make_solver("fallback", 10, "fallback answer")})
+        answers = service.spoken_answers_batch(["easy", "hard", "easy"])
+        self.assertEqual(answers, ["partial answer", "fallback answer",
+                                   "partial answer"])
+        service.shutdown()
+
+    def test_native_routing(self):
+        service = make_service({
+            "route_en": make_solver("route_en", 90, "en answer"),
+            "route_pt": make_solver("route_pt", 10, "resposta", lang="pt")})
+        self.assertEqual(service.lang_routes["pt"], ["route_pt"])
+        self.assertEqual(service.spoken_answers("pergunta", {"lang": "pt"}),
+                         "resposta")
+        # english speakers still get the highest priority solver
+        self.assertEqual(service.spoken_answers("question", {"lang": "en"}),
+                         "en answer")
+        service.shutdown()
+
+        service = make_service({
+            "route_en": make_solver("route_en", 90, "en answer"),
+            "route_pt": make_solver("route_pt", 10, "resposta", lang="pt")},
+            prefer_native_solvers=False)
+        names = [name for name, _, _ in service._available_modules("pt")]
+        self.assertEqual(names, ["route_en", "route_pt"])
+        service.shutdown()
+
+    def test_shared_translation(self):
+        for parallel in (False, True):
+            service = make_service({
+                "tx_a": make_solver("tx_a", 90, ""),
+                "tx_b": make_solver("tx_b", 50, ""),
+                "tx_c": make_solver("tx_c", 10, "answer")},
+                parallel=parallel)
+            calls = []
+
+            def translate(text, target, source, store=True):
+                calls.append(text)
+                return f"{target}: {text}"
+
+            for module in service.modules:
+                module._translate = translate
+            self.assertEqual(service.spoken_answers(f"pergunta {parallel}",
+                                                    {"lang": "pt"}),
+                             "pt: answer")
+            self.assertEqual(calls.count(f"pergunta {parallel}"), 1)
+            service.shutdown()
+
+    def test_lazy_load(self):
+        plugins = {"a": make_solver("a", 90, "a answer"),
+                   "b": make_solver("b", 10, "b answer")}
+        installed = entry_points(plugins)
+        with patch("neon_solvers._solver_entry_points",
+                   return_value=installed) as find:
+            service = make_service(plugins, lazy_load=True)
+            find.assert_not_called()
+            self.assertEqual(service.loaded_modules, {})
+
+            self.assertEqual(service.spoken_answers("question"), "a answer")
+            self.assertEqual(set(service.loaded_modules), {"a", "b"})
+            self.assertEqual(set(service.load_times), {"a", "b"})
+            # entry points are looked up once, each plugin imported once
+            find.assert_called_once()
+            installed["a"].load.assert_called_once()
+            installed["b"].load.assert_called_once()
+        service.shutdown()
+
+    def test_missing_plugin(self):
+        service = make_service({"a": make_solver("a", 90, "a answer")},
+                               plugin_config={"missing": {}})
+        self.assertEqual(set(service.loaded_modules), {"a"})
+        self.assertEqual(service.spoken_answers("question"), "a answer")
+        service.shutdown()
+
+    def test_plugin_config_values(self):
+        plugins = {"a": make_solver("a", 90, "a answer"),
+                   "b": make_solver("b", 10, "b answer")}
+        # any configured key naming an installed plugin loads it
+        service = make_service(plugins, plugin_config={"a": True},
+                               solver_timeout=5)
+        self.assertEqual(set(service.loaded_modules), {"a", "b"})
+        service.shutdown()
+
+    def test_warmup(self):
+        plugins = {"a": make_solver("a", 90, "a answer")}
+        with patch("neon_solvers._solver_entry_points",
+                   return_value=entry_points(plugins)):
+            service = make_service(plugins, lazy_load=True, warmup=True)
+            for _ in range(50):
+                if service.loaded_modules:
+                    break
+                sleep(0.02)
+        self.assertEqual(set(service.loaded_modules), {"a"})
+        service.shutdown()
+
+class TestBusApi(unittest.TestCase):
+    def test_bus_requests(self):
+        bus = FakeBus()
+        service = make_service({"bus": make_solver("bus", 50, "42")},
+                               bus=bus)
+        bus.emit(FakeMessage("neon.solvers.question",
+                             {"utterance": "question", "request_id": "1"}))
+        bus.emit(FakeMessage("neon.solvers.search",
+                             {"utterance": "question", "lang": "en"}))
+        bus.emit(FakeMessage("neon.solvers.long_answer",
+                             {"utterance": "question"}))
+
+        reply = bus.wait_for("neon.solvers.question.response")[0]
+        self.assertEqual(reply.data, {"utterance": "question",
+                                      "request_id": "1", "answer": "42"})
+        reply = bus.wait_for("neon.solvers.search.response")[0]
+        self.assertEqual(reply.data["answer"], {"short_answer": "42"})
+        self.assertTrue(reply.data["request_id"])
+        reply = bus.wait_for("neon.solvers.long_answer.response")[0]
+        self.assertEqual(reply.data["answer"][0]["summary"], "42")
+
+        service.shutdown()
+        self.assertEqual(bus.handlers["neon.solvers.question"], [])
+
+    def test_concurrency_and_backpressure(self):
+        bus = FakeBus()
+        service = make_service({"slow": make_solver("slow", 50, "42", 0.3)},
+                               bus=bus, bus_workers=4, bus_queue_size=4)
+        start = monotonic()
+        for i in range(6):
+            bus.emit(FakeMessage("neon.solvers.question",
+                                 {"utterance": f"question {i}",
+                                  "request_id": str(i)}))
+        replies = bus.wait_for("neon.solvers.question.response", 6)
+        self.assertLess(monotonic() - start, 1)
+        errors = {m.data["request_id"]: m.data.get("error") for m in replies}
+        # 4 requests answered concurrently, the rest rejected
+        self.assertEqual(errors, {"0": None, "1": None, "2": None, "3": None,
+                                  "4": "busy", "5": "busy"})
+        service.shutdown()
+
+    def test_errors(self):
+        bus = FakeBus()
+        service = make_service({"bus": make_solver("bus", 50, "42")},
+                               bus=bus)
+        bus.emit(FakeMessage("neon.solvers.question", {"request_id": "1"}))
+        reply = bus.wait_for("neon.solvers.question.response")[0]
+        self.assertIsNone(reply.data["answer"])
+        self.assertIn("error", reply.data)
+        service.shutdown()
+
+
+@unittest.skipUnless(multiprocessing.get_start_method() == "fork",
+                     "worker processes need the patched plugin loader")
+class TestProcessWorkers(unittest.TestCase):
+    def test_process_workers(self):
+        class PidSolver(make_solver("pid", 50, "")):
+            def get_spoken_answer(self, query, context=None):
+                sleep(0.1)
+                return f"{query} {os.getpid()}"
+
+        plugins = {"pid": PidSolver}
+        with patch("neon_solvers._solver_entry_points",
+                   return_value=entry_points(plugins)):
+            service = make_service(plugins, process_workers=2)
+            self.assertEqual(service.loaded_modules, {})
+            answer = service.spoken_answers("question")
+            self.assertTrue(answer.startswith("question "))
+            self.assertNotEqual(answer, f"question {os.getpid()}")
+
+            answers = service.spoken_answers_batch(["a", "b", "a", "c"])
+            self.assertEqual([a.split()[0] for a in answers],
+                             ["a", "b", "a", "c"])
+            self.assertEqual(answers[0], answers[2])
+            self.assertEqual(len({a.split()[1] for a in answers}), 2)
+
+            answer = asyncio.run(service.aspoken_answers("question"))
+            self.assertTrue(answer.startswith("question "))
+            # plugins are never loaded in this process
+            self.assertEqual(service.modules, [])
+            self.assertEqual(service.loaded_modules, {})
+            service.shutdown()
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_open_and_recover(self):
+        breaker = CircuitBreaker(max_failures=2, cooldown=0.1)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open)
+        self.assertFalse(breaker.allow())
+
+        sleep(0.15)
+        # half open, a single trial request is allowed
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+        self.assertTrue(breaker.allow())
+
+    def test_release_trial(self):
+        breaker = CircuitBreaker(max_failures=1, cooldown=0.1)
+        breaker.record_failure()
+        sleep(0.15)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        # the trial request was never sent, the next one gets it
+        breaker.release()
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        # releasing without a trial in flight changes nothing
+        breaker.record_failure()
+        breaker.release()
+        self.assertFalse(breaker.allow())
+
@@ -0,0 +1,61 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import unittest
+
+from neon_solvers.similarity import SimilarityIndex
+
+
+class TestSimilarityIndex(unittest.TestCase):
+    def test_search(self):
+        index = SimilarityIndex(keys=["what is the speed of light",
+                                      "who is isaac newton",
+                                      "what is the capital of france"])
+        key, score = index.search("whats the speed of light")
+        self.assertEqual(key, "what is the speed of light")
+        self.assertGreater(score, 0.8)
+        self.assertEqual(index.search("who was isaac newton", 0.7)[0],
+                         "who is isaac newton")
+        self.assertEqual(index.search("how old is obama", 0.5), (None, 0.0))
+        self.assertAlmostEqual(index.search("who is isaac newton")[1], 1.0)
+        self.assertNotEqual(index.search("who is isaac newton",
+                                         exclude="who is isaac newton")[0],
+                            "who is isaac newton")
+
+    def test_incremental(self):
+        index = SimilarityIndex()
+        self.assertEqual(index.search("anything"), (None, 0.0))
+        index.on_change("what is the speed of light", True)
+        self.assertIn("what is the speed of light", index)
+        self.assertEqual(index.search("speed of light")[0],
+                         "what is the speed of light")
+        index.on_change("what is the speed of light", False)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.search("speed of light"), (None, 0.0))
+        index.add("a")
+        index.on_change(None, False)
+        self.assertEqual(len(index), 0)
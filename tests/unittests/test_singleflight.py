@@ -0,0 +1,109 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+from neon_solvers.singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_shared_result(self):
+        flights = SingleFlight()
+        calls = []
+
+        def slow(value):
+            calls.append(value)
+            sleep(0.2)
+            return value * 2
+
+        with ThreadPoolExecutor(5) as pool:
+            results = list(pool.map(lambda _: flights.do("key", slow, 21),
+                                    range(5)))
+        self.assertEqual(calls, [21])
+        self.assertEqual([r[0] for r in results], [42] * 5)
+        self.assertEqual(sum(r[1] for r in results), 1)
+        self.assertEqual(len(flights), 0)
+
+    def test_shared_error(self):
+        flights = SingleFlight()
+
+        def broken():
+            sleep(0.1)
+            raise ValueError("backend down")
+
+        def call(_):
+            try:
+                flights.do("key", broken)
+            except ValueError as e:
+                return str(e)
+
+        with ThreadPoolExecutor(3) as pool:
+            self.assertEqual(list(pool.map(call, range(3))),
+                             ["backend down"] * 3)
+
+    def test_async(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def slow(value):
+            calls.append(value)
+            await asyncio.sleep(0.1)
+            return value * 2
+
+        async def run():
+            return await asyncio.gather(
+                *[flights.ado("key", slow, 21) for _ in range(5)])
+
+        results = asyncio.run(run())
+        self.assertEqual(calls, [21])
+        self.assertEqual(sorted(results), [(42, False)] * 4 + [(42, True)])
+
+    def test_async_leader_cancelled(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def slow(value):
+            calls.append(value)
+            await asyncio.sleep(0.2)
+            return value * 2
+
+        async def run():
+            leader = asyncio.ensure_future(flights.ado("key", slow, 21))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flights.ado("key", slow, 21))
+            # the leader gives up, the follower still gets the answer
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(leader, 0.05)
+            return await follower
+
+        self.assertEqual(asyncio.run(run()), (42, False))
+        self.assertEqual(calls, [21])
+        self.assertEqual(len(flights), 0)
@@ -0,0 +1,134 @@
+# NEON AI (TM) SOFTWARE, Software Development Kit & Application Framework
+# All trademark and other rights reserved by their respective owners
+# Copyright 2008-2022 Neongecko.com Inc.
+# Contributors: Daniel McKnight, Guy Daniels, Elon Gasper, Richard Leeds,
+# Regina Bloomstine, Casimiro Ferreira, Andrii Pernatii, Kirill Hrymailo
+# BSD-3 License
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+# 3. Neither the name of the copyright holder nor the names of its
+#    contributors may be used to endorse or promote products derived from this
+#    software without specific prior written permission.
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO,
+# THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS  BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA,
+# OR PROFITS;  OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE,  EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import gzip
+import json
+import unittest
+from os.path import join
+from tempfile import mkdtemp
+from time import monotonic
+from unittest.mock import Mock, patch
+
+from neon_solvers import AbstractSolver
+from neon_solvers.warmup import RateLimiter, export_cache, import_cache, \
+    main, prewarm
+
+
+class WarmSolver(AbstractSolver):
+    def __init__(self, folder=None):
+        super().__init__(name="WarmSolver", config={
+            "lang": "en", "cache_folder": folder or mkdtemp(),
+            "cache_backend": "sqlite"})
+        self.calls = []
+
+    def get_spoken_answer(self, query, context=None):
+        self.calls.append(query)
+        if query == "broken":
+            raise ValueError("backend down")
+        return f"answer to {query}" if query != "unknown" else ""
+
+
+class TestPrewarm(unittest.TestCase):
+    def test_prewarm(self):
+        solver = WarmSolver()
+        stats = prewarm(solver, ["a", "b", "a", "unknown", "broken"],
+                        methods=["spoken_answer"], concurrency=2)
+        self.assertEqual(stats["answered"], 2)
+        self.assertEqual(stats["empty"], 1)
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(sorted(solver.calls),
+                         ["a", "b", "broken", "unknown"])
+        solver.spoken_answer("a")
+        self.assertEqual(len(solver.calls), 4)
+        solver.shutdown()
+
+    def test_rate_limit(self):
+        limiter = RateLimiter(20)
+        start = monotonic()
+        for _ in range(5):
+            limiter.wait()
+        self.assertGreaterEqual(monotonic() - start, 0.19)
+        # no limit
+        RateLimiter().wait()
+
+
+class TestExportImport(unittest.TestCase):
+    def test_roundtrip(self):
+        path = join(mkdtemp(), "cache.jsonl.gz")
+        source = WarmSolver()
+        prewarm(source, ["a", "b"], methods=["search", "spoken_answer"])
+        counts = export_cache(source, path)
+        self.assertEqual(counts, {"data": 2, "spoken": 2, "steps": 0,
+                                  "image": 0, "record": 0, "translation": 0})
+        source.shutdown()
+        with gzip.open(path, "rt") as f:
+            header = json.loads(f.readline())
+        self.assertEqual(header["version"], 1)
+
+        target = WarmSolver()
+        target.spoken_cache["a"] = "local answer"
+        counts = import_cache(target, path)
+        # existing entries are kept
+        self.assertEqual(counts, {"data": 2, "spoken": 1, "steps": 0,
+                                  "image": 0, "record": 0, "translation": 0})
+        self.assertEqual(target.spoken_answer("a"), "local answer")
+        self.assertEqual(target.spoken_answer("b"), "answer to b")
+        self.assertEqual(target.calls, [])
+        import_cache(target, path, overwrite=True)
+        target.memory_cache.clear()
+        self.assertEqual(target.spoken_answer("a"), "answer to a")
+        target.shutdown()
+
+    def test_invalid_file(self):
+        path = join(mkdtemp(), "cache.jsonl")
+        with open(path, "w") as f:
+            f.write(json.dumps({"format": "neon_solvers.cache",
+                                "version": 99}) + "\n")
+        solver = WarmSolver()
+        with self.assertRaises(ValueError):
+            import_cache(solver, path)
+        with open(path, "w") as f:
+            f.write("{}\n")
+        with self.assertRaises(ValueError):
+            import_cache(solver, path)
+        solver.shutdown()
+
+    def test_cli(self):
+        folder = mkdtemp()
+        questions = join(folder, "questions.txt")
+        with open(questions, "w") as f:
+            f.write("a\n\nb\n")
+        loader = Mock(return_value=lambda: WarmSolver(folder))
+        with patch("ovos_plugin_manager.solvers.load_question_solver_plugin",
+                   loader):
+            stats = main(["prewarm", "warm-plugin", questions,
+                          "--methods", "spoken_answer", "--rate-limit", "100"])
+            self.assertEqual(stats["answered"], 2)
+            counts = main(["export", "warm-plugin", join(folder, "out.jsonl"),
+                           "--caches", "spoken"])
+            self.assertEqual(counts, {"spoken": 2})
+        loader.assert_called_with("warm-plugin")